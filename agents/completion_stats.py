@@ -0,0 +1,99 @@
+"""
+Completion-length statistics for The Differential generation agents.
+Records how many tokens completions actually use per (model, category) and
+derives max_tokens from a high percentile plus a safety margin, so requests
+reserve what they need instead of one fixed worst-case allowance.
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent processes may drop each other's samples
+    fcntl = None
+
+
+def percentile(samples: List[int], pct: float) -> int:
+    """Nearest-rank percentile of a non-empty sample."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class CompletionStats:
+    """Rolling window of completion sizes per (model, category), persisted to a JSON file."""
+
+    def __init__(self, path: str, window: int = 200, min_samples: int = 10,
+                 pct: float = 95, margin: float = 0.15):
+        self.path = path
+        self.lock_file = path + ".lock"
+        self.window = window
+        self.min_samples = min_samples
+        self.pct = pct
+        self.margin = margin
+        self.logger = logging.getLogger("differential.completion_stats")
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[int]] = self._load()
+
+    @staticmethod
+    def key(model: str, category: str) -> str:
+        return f"{model}|{category}"
+
+    def _load(self) -> Dict[str, List[int]]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("samples", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        temp_file = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump({"samples": self.samples}, f)
+        os.replace(temp_file, self.path)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the thread lock and an exclusive lock on the stats file across processes."""
+        with self._lock:
+            with open(self.lock_file, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def record(self, model: str, category: str, completion_tokens: int):
+        """Add one observed completion size (including any continuations)."""
+        with self._exclusive():
+            # Merge with what other processes recorded since we loaded
+            self.samples = self._load() or self.samples
+            history = self.samples.setdefault(self.key(model, category), [])
+            history.append(int(completion_tokens))
+            del history[:-self.window]
+            self._save()
+
+    def max_tokens_for(self, model: str, category: str, default: int,
+                       floor: int = 256, ceiling: Optional[int] = None) -> int:
+        """
+        Completion allowance for the next request.
+
+        With enough history: the configured percentile plus the margin, clamped
+        to [floor, ceiling]. Until then the default applies.
+        """
+        history = self.samples.get(self.key(model, category), [])
+        if len(history) < self.min_samples:
+            return default
+        limit = int(percentile(history, self.pct) * (1 + self.margin))
+        limit = max(floor, limit)
+        if ceiling is not None:
+            limit = min(ceiling, limit)
+        return limit
@@ -0,0 +1,215 @@
+"""
+Tolerant JSON extraction for model completions.
+Finds the outermost JSON object in a response (ignoring prose and markdown
+fences around it) and parses it in a single left-to-right scan, repairing
+common defects: trailing or missing commas, raw control characters in
+strings, and completions cut off mid-value. Anything that had to be dropped
+is reported by path (e.g. "explanations.tile_8") so callers can decide
+whether the result is still usable.
+"""
+
+import json
+from json.decoder import scanstring
+import re
+from typing import Any, Dict, List, Tuple
+
+_DECODER = json.JSONDecoder(strict=False)
+_WHITESPACE = re.compile(r"\s*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+# An object start that is plausibly JSON rather than braces in prose
+_OBJECT_START = re.compile(r'\{\s*(?:"|\})')
+
+
+class JSONRepairError(ValueError):
+    """Raised when no JSON object can be recovered from the text."""
+
+
+class _Truncated(Exception):
+    """The text ended inside a value."""
+
+
+class RepairReport:
+    """What had to be changed to parse a response."""
+
+    def __init__(self):
+        self.repairs: List[str] = []
+        self.lost: List[str] = []
+        self.truncated = False
+
+    @property
+    def clean(self) -> bool:
+        return not self.repairs and not self.lost
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"repairs": self.repairs, "lost": self.lost, "truncated": self.truncated}
+
+
+def _join(path: str, key) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+class _TolerantParser:
+    """Recursive-descent JSON parser that closes what the text left open."""
+
+    def __init__(self, text: str, report: RepairReport):
+        self.text = text
+        self.end = len(text)
+        self.report = report
+
+    def skip(self, pos: int) -> int:
+        return _WHITESPACE.match(self.text, pos).end()
+
+    def at_eof(self, pos: int, path: str) -> bool:
+        if pos < self.end:
+            return False
+        if not self.report.truncated:
+            self.report.truncated = True
+            self.report.repairs.append(f"closed truncated input at {path or '<root>'}")
+        return True
+
+    def value(self, pos: int, path: str) -> Tuple[Any, int]:
+        pos = self.skip(pos)
+        if pos >= self.end:
+            raise _Truncated()
+        char = self.text[pos]
+        if char == "{":
+            return self.object(pos + 1, path)
+        if char == "[":
+            return self.array(pos + 1, path)
+        if char == '"':
+            try:
+                return scanstring(self.text, pos + 1, False)
+            except json.JSONDecodeError as e:
+                if e.msg.startswith("Unterminated string"):
+                    raise _Truncated()
+                raise JSONRepairError(f"{e.msg} at {path or '<root>'} (char {e.pos})")
+
+        match = _NUMBER.match(self.text, pos)
+        if match:
+            # A number running into the end of the text may have lost digits
+            if match.end() >= self.end:
+                raise _Truncated()
+            return _DECODER.decode(match.group()), match.end()
+        for literal, result in _LITERALS.items():
+            if self.text.startswith(literal, pos):
+                return result, pos + len(literal)
+            if literal.startswith(self.text[pos:pos + len(literal)]) and pos + len(literal) > self.end:
+                raise _Truncated()
+        raise JSONRepairError(f"Unexpected character {char!r} at {path or '<root>'} (char {pos})")
+
+    def after_item(self, pos: int, closer: str, path: str) -> Tuple[bool, int]:
+        """Consume the separator after an item; returns (container_done, pos)."""
+        pos = self.skip(pos)
+        if self.at_eof(pos, path):
+            return True, pos
+        char = self.text[pos]
+        if char == closer:
+            return True, pos + 1
+        if char == ",":
+            next_pos = self.skip(pos + 1)
+            if next_pos < self.end and self.text[next_pos] == closer:
+                self.report.repairs.append(f"removed trailing comma in {path or '<root>'}")
+                return True, next_pos + 1
+            return False, pos + 1
+        if char in '"{[' or char.isdigit() or char == "-":
+            self.report.repairs.append(f"inserted missing comma in {path or '<root>'}")
+            return False, pos
+        raise JSONRepairError(f"Expected ',' or {closer!r} in {path or '<root>'} (char {pos})")
+
+    def object(self, pos: int, path: str) -> Tuple[Dict[str, Any], int]:
+        result = {}
+        pos = self.skip(pos)
+        if self.at_eof(pos, path):
+            return result, pos
+        if self.text[pos] == "}":
+            return result, pos + 1
+
+        while True:
+            pos = self.skip(pos)
+            if self.at_eof(pos, path):
+                return result, pos
+            if self.text[pos] != '"':
+                raise JSONRepairError(f"Expected property name in {path or '<root>'} (char {pos})")
+            try:
+                key, pos = scanstring(self.text, pos + 1, False)
+            except json.JSONDecodeError as e:
+                if not e.msg.startswith("Unterminated string"):
+                    raise JSONRepairError(f"{e.msg} in {path or '<root>'} (char {e.pos})")
+                # Cut off inside a key: its value is gone too
+                self.at_eof(self.end, path)
+                self.report.lost.append(_join(path, self.text[pos + 1:].strip() + "…"))
+                return result, self.end
+            child = _join(path, key)
+
+            pos = self.skip(pos)
+            if self.at_eof(pos, path):
+                self.report.lost.append(child)
+                return result, pos
+            if self.text[pos] != ":":
+                raise JSONRepairError(f"Expected ':' after {child} (char {pos})")
+
+            try:
+                result[key], pos = self.value(pos + 1, child)
+            except _Truncated:
+                self.at_eof(self.end, path)
+                self.report.lost.append(child)
+                return result, self.end
+
+            done, pos = self.after_item(pos, "}", path)
+            if done:
+                return result, pos
+
+    def array(self, pos: int, path: str) -> Tuple[List[Any], int]:
+        result = []
+        pos = self.skip(pos)
+        if self.at_eof(pos, path):
+            return result, pos
+        if self.text[pos] == "]":
+            return result, pos + 1
+
+        while True:
+            child = _join(path, len(result))
+            try:
+                item, pos = self.value(pos, child)
+            except _Truncated:
+                self.at_eof(self.end, path)
+                self.report.lost.append(child)
+                return result, self.end
+            result.append(item)
+
+            done, pos = self.after_item(pos, "]", path)
+            if done:
+                return result, pos
+
+
+def find_object_start(text: str) -> int:
+    """Index of the first '{' that opens a JSON object, or -1."""
+    match = _OBJECT_START.search(text)
+    return match.start() if match else -1
+
+
+def extract_json(text: str) -> Tuple[Dict[str, Any], RepairReport]:
+    """
+    Extract the outermost JSON object from a model response.
+
+    Well-formed JSON takes the C decoder's fast path; anything else gets one
+    tolerant pass. Returns the object and a RepairReport describing what was
+    fixed and which fields were lost. Raises JSONRepairError when nothing
+    usable is found.
+    """
+    report = RepairReport()
+    start = find_object_start(text)
+    if start == -1:
+        raise JSONRepairError("No JSON object found in response")
+
+    try:
+        result, _ = _DECODER.raw_decode(text, start)
+        return result, report
+    except json.JSONDecodeError:
+        pass
+
+    result, _ = _TolerantParser(text, report).object(start + 1, "")
+    return result, report
@@ -3,12 +3,17 @@ OpenAI-powered puzzle generation agent for The Differential.
 Generates complete medical puzzles using GPT models.
 """
 
-import json
+import copy
 import asyncio
 import random
-from typing import Dict, Any
-from openai import OpenAI
+from typing import Dict, Any, List, Optional
+from openai import AsyncOpenAI
 from .base_agent import BaseAgent
+from .prompt_template import PromptTemplate, count_tokens
+from .rate_limiter import SharedRateLimiter
+from .json_repair import extract_json
+from .topic_agent import TopicAgent, normalize_answer
+from .completion_stats import CompletionStats
 import config
 import sys
 import os
@@ -16,28 +21,57 @@ import os
 # Add parent directory to path for discipline_selector import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from discipline_selector import DisciplineSelector
+from differential_graph import DifferentialGraph, merge_concepts
 
 class OpenAIPuzzleAgent(BaseAgent):
     """Agent that generates complete puzzles using OpenAI GPT models."""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, topic_agent: Optional[TopicAgent] = None,
+                 differential_graph: Optional[DifferentialGraph] = None):
         super().__init__("OpenAI Puzzle Generator")
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
         self.model = config.OPENAI_MODEL
         self.temperature = config.OPENAI_TEMPERATURE
         self.max_tokens = config.OPENAI_MAX_TOKENS
         self.discipline_selector = DisciplineSelector()
+        self.prompt_template = PromptTemplate(
+            config.FOCUSED_PROMPT_FILE,
+            ["DISCIPLINE", "CATEGORY", "SPECIFIC_INSTRUCTIONS", "DATE"],
+            model=self.model
+        )
+        self.last_prompt_report = None
+        self.last_parse_report = None
+        self.topic_agent = topic_agent
+        self.differential_graph = differential_graph
+        self.completion_stats = CompletionStats(
+            config.COMPLETION_STATS_FILE,
+            window=config.COMPLETION_STATS_WINDOW,
+            min_samples=config.COMPLETION_MIN_SAMPLES,
+            pct=config.COMPLETION_PERCENTILE,
+            margin=config.COMPLETION_MARGIN
+        )
+        self.rate_limiter = SharedRateLimiter(
+            config.RATE_LIMIT_STATE_FILE,
+            requests_per_minute=config.OPENAI_RPM_LIMIT,
+            tokens_per_minute=config.OPENAI_TPM_LIMIT,
+            target_utilization=config.RATE_LIMIT_TARGET_UTILIZATION,
+            max_request_tokens=config.RATE_LIMIT_MAX_REQUEST_TOKENS
+        )
         
-    async def generate(self, forced_discipline: str = None, forced_category: str = None, **kwargs) -> Dict[str, Any]:
-        """Generate a complete medical puzzle using two-stage approach."""
+    async def generate(self, forced_discipline: str = None, forced_category: str = None,
+                       date: str = None, **kwargs) -> Dict[str, Any]:
+        """
+        Generate a complete medical puzzle using two-stage approach.
+        
+        With a date, discipline and category follow the dated selection plan
+        (DisciplineSelector.select_for_date) and the puzzle is stamped with it.
+        """
         self.logger.info("Starting two-stage puzzle generation...")
         
         # STAGE 1: Deterministic discipline and category selection
         self.logger.info("Stage 1: Selecting discipline and category...")
-        selection_result = self.discipline_selector.select_discipline_and_category(
-            forced_discipline=forced_discipline,
-            forced_category=forced_category
-        )
+        selection_result = self._select(forced_discipline, forced_category, date)
+        puzzle_date = date or config.DEFAULT_DATE
         
         selected_discipline = selection_result["discipline"]
         selected_category = selection_result["category"]
@@ -46,42 +80,48 @@ class OpenAIPuzzleAgent(BaseAgent):
         self.logger.info(f"✅ Selected: {selected_discipline} / {selected_category}")
         self.logger.info(f"📝 Rationale: {selection_rationale}")
         
+        topic = self._select_topic(selected_discipline, selected_category, puzzle_date, dated=bool(date))
+        if topic:
+            selection_result["topic"] = topic["answer"]
+        prefill = self._prefill_concepts(topic, selected_discipline)
+        
         # STAGE 2: AI content generation for specific discipline/category
         self.logger.info("Stage 2: Generating medical content...")
-        prompt = self._load_focused_prompt(selected_discipline, selected_category, selection_rationale)
+        prompt = self._load_focused_prompt(selected_discipline, selected_category, selection_rationale, puzzle_date,
+                                           topic=topic["answer"] if topic else None, prefill=prefill)
         
+        succeeded = False
         try:
-            # Make API call
-            self.logger.info(f"Calling OpenAI API with model: {self.model}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert medical educator creating diagnostic puzzles. Always respond with valid JSON only, no additional text."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
+            # Make API call, sized from how long this kind of puzzle usually runs
+            stats_key = f"{selected_category}/prefill" if prefill else selected_category
+            max_tokens = self.completion_stats.max_tokens_for(
+                self.model, stats_key, self.max_tokens, ceiling=config.OPENAI_MAX_TOKENS_CEILING
             )
-            
-            # Parse response
-            content = response.choices[0].message.content.strip()
-            self.logger.info("Received response from OpenAI")
+            content, completion_tokens = await self._complete(prompt, max_tokens)
+            self.completion_stats.record(self.model, stats_key, completion_tokens)
             
             # Clean and parse JSON
             puzzle_data = self._parse_json_response(content)
             
+            # A truncated completion usually only loses trailing explanations
+            if self.last_parse_report.lost:
+                puzzle_data = await self._salvage_explanations(puzzle_data)
+            
             # Add selection metadata to puzzle
             puzzle_data["selection_metadata"] = selection_result
+            if date:
+                puzzle_data["date"] = date
+            if topic and normalize_answer(puzzle_data.get("answer", "")) != normalize_answer(topic["answer"]):
+                self.logger.warning(f"⚠️  Assigned topic '{topic['answer']}' but got '{puzzle_data.get('answer')}'")
+            # The prompt asked for only a few concepts, so the prefill must run whatever the answer
+            if prefill and puzzle_data.get("answer"):
+                prefill = self._prefill_for_answer(puzzle_data["answer"], topic, prefill, selected_discipline)
+                self._apply_prefill(puzzle_data, prefill, selection_result)
             
             # Validate the puzzle
             if self.validate_puzzle(puzzle_data):
                 self.logger.info(f"✅ Generated puzzle: {puzzle_data.get('answer', 'Unknown')}")
+                succeeded = True
                 return puzzle_data
             else:
                 raise ValueError("Generated puzzle failed validation")
@@ -89,31 +129,420 @@ class OpenAIPuzzleAgent(BaseAgent):
         except Exception as e:
             self.logger.error(f"Failed to generate puzzle: {e}")
             raise
+        finally:
+            # Also runs when a speculative generation is cancelled (CancelledError is not an Exception)
+            if topic and not succeeded:
+                self.topic_agent.release_topic(topic["answer"])
     
-    def _load_focused_prompt(self, discipline: str, category: str, rationale: str) -> str:
-        """Load the focused prompt with specific discipline and category."""
+    async def generate_tracks(self, tracks: List[str], forced_discipline: str = None, forced_category: str = None,
+                              date: str = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate linked puzzles for several audience tracks around one answer.
+        
+        Selection, topic and the shared core (answer, acceptable answers,
+        differential) are produced once; each track's tiles and explanations
+        are then requested concurrently with that core as context.
+        """
+        unknown = [track for track in tracks if track not in config.AUDIENCE_TRACKS]
+        if unknown:
+            raise ValueError(f"Unknown tracks: {', '.join(unknown)}")
+        
+        self.logger.info(f"Starting fan-out generation for tracks: {', '.join(tracks)}")
+        selection_result = self._select(forced_discipline, forced_category, date)
+        puzzle_date = date or config.DEFAULT_DATE
+        discipline = selection_result["discipline"]
+        category = selection_result["category"]
+        self.logger.info(f"✅ Selected: {discipline} / {category}")
+        
+        topic = self._select_topic(discipline, category, puzzle_date, dated=bool(date))
+        if topic:
+            selection_result["topic"] = topic["answer"]
+        prefill = self._prefill_concepts(topic, discipline)
+        
+        succeeded = False
         try:
-            with open('AI_FOCUSED_PROMPT.md', 'r') as f:
-                prompt_content = f.read()
-            
-            # Replace placeholders with actual values
-            prompt_content = prompt_content.replace("[DISCIPLINE_PLACEHOLDER]", discipline)
-            prompt_content = prompt_content.replace("[CATEGORY_PLACEHOLDER]", category)
-            
-            # Add specific instructions based on category
-            specific_instructions = self._get_category_instructions(category, discipline)
-            prompt_content = prompt_content.replace("[SPECIFIC_INSTRUCTIONS_PLACEHOLDER]", specific_instructions)
-            
-            # Add date
-            date_instruction = f"\n\nGenerate puzzle for date: {config.DEFAULT_DATE}"
-            
-            return prompt_content + date_instruction
+            # Shared core: one request for everything the tracks have in common
+            prompt = self._get_core_prompt(discipline, category, puzzle_date, topic["answer"] if topic else None, prefill)
+            stats_key = f"{category}/core/prefill" if prefill else f"{category}/core"
+            max_tokens = self.completion_stats.max_tokens_for(
+                self.model, stats_key, config.FANOUT_CORE_MAX_TOKENS, ceiling=config.OPENAI_MAX_TOKENS_CEILING
+            )
+            content, completion_tokens = await self._complete(prompt, max_tokens)
+            self.completion_stats.record(self.model, stats_key, completion_tokens)
+            core = self._parse_json_response(content)
+            for field in ["answer", "acceptable_answers", "concepts"]:
+                if not core.get(field):
+                    raise ValueError(f"Shared core is missing '{field}'")
+            self.logger.info(f"✅ Core answer: {core['answer']}")
+            if topic and normalize_answer(core["answer"]) != normalize_answer(topic["answer"]):
+                self.logger.warning(f"⚠️  Assigned topic '{topic['answer']}' but got '{core['answer']}'")
+            if prefill:
+                prefill = self._prefill_for_answer(core["answer"], topic, prefill, discipline)
+                self._apply_prefill(core, prefill, selection_result)
             
+            base = {
+                "date": puzzle_date,
+                "discipline": discipline,
+                "category": category,
+                "topic_rationale": core.get("topic_rationale", ""),
+                "answer": core["answer"],
+                "acceptable_answers": core["acceptable_answers"],
+                "concepts": core["concepts"]
+            }
+            results = await asyncio.gather(
+                *(self._generate_track(base, track, selection_result) for track in tracks),
+                return_exceptions=True
+            )
+            failed = [f"{track}: {result}" for track, result in zip(tracks, results) if isinstance(result, Exception)]
+            if failed:
+                raise ValueError(f"Track generation failed ({'; '.join(failed)})")
+            succeeded = True
+        except Exception as e:
+            self.logger.error(f"Failed to generate puzzle tracks: {e}")
+            raise
+        finally:
+            if topic and not succeeded:
+                self.topic_agent.release_topic(topic["answer"])
+        
+        self.logger.info(f"✅ Generated {len(tracks)} linked puzzles for {base['answer']}")
+        return dict(zip(tracks, results))
+    
+    async def _generate_track(self, base: Dict[str, Any], track: str, selection_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Tiles and explanations for one track on top of the shared core."""
+        prompt = self._get_track_prompt(base, track)
+        stats_key = f"{base['category']}/track"
+        max_tokens = self.completion_stats.max_tokens_for(
+            self.model, stats_key, config.FANOUT_TRACK_MAX_TOKENS, ceiling=config.OPENAI_MAX_TOKENS_CEILING
+        )
+        content, completion_tokens = await self._complete(prompt, max_tokens)
+        self.completion_stats.record(self.model, stats_key, completion_tokens)
+        
+        board = self._parse_json_response(content)
+        lost = bool(self.last_parse_report.lost)
+        puzzle = dict(copy.deepcopy(base), tiles=board.get("tiles", []), explanations=board.get("explanations", {}))
+        if lost:
+            puzzle = await self._salvage_explanations(puzzle)
+        puzzle["track"] = track
+        puzzle["selection_metadata"] = dict(selection_result, track=track)
+        
+        if not self.validate_puzzle(puzzle):
+            raise ValueError("failed validation")
+        return puzzle
+    
+    def _select(self, forced_discipline: str = None, forced_category: str = None, date: str = None) -> Dict[str, Any]:
+        """Discipline and category, following the dated plan when a date is given."""
+        if date:
+            return self.discipline_selector.select_for_date(
+                date,
+                forced_discipline=forced_discipline,
+                forced_category=forced_category
+            )
+        return self.discipline_selector.select_discipline_and_category(
+            forced_discipline=forced_discipline,
+            forced_category=forced_category
+        )
+    
+    def _select_topic(self, discipline: str, category: str, date: str, dated: bool = False) -> Optional[Dict[str, Any]]:
+        """Ask the topic agent for an unused answer; None lets the model choose."""
+        if self.topic_agent is None:
+            return None
+        # Dated runs pick reproducibly for a given archive state
+        rng = random.Random(f"topic|{date}") if dated else None
+        try:
+            return self.topic_agent.select_topic(discipline, category, date, rng)
+        except FileNotFoundError:
+            self.logger.warning(f"⚠️  Topic catalog '{self.topic_agent.catalog_path}' not found; model will choose the answer")
+            return None
+    
+    def _prefill_concepts(self, topic: Optional[Dict[str, Any]], discipline: str) -> List[str]:
+        """Differential for an assigned topic from the co-occurrence graph; empty when it knows too little."""
+        if self.differential_graph is None or not topic:
+            return []
+        neighbours = self.differential_graph.neighbours(topic["answer"], discipline, limit=config.GRAPH_PREFILL_MAX)
+        if len(neighbours) < config.GRAPH_PREFILL_MIN:
+            self.logger.info(f"🕸️  Graph knows {len(neighbours)} neighbours of {topic['answer']}; model writes the full differential")
+            return []
+        self.logger.info(f"🕸️  Prefilled {len(neighbours)} differential concepts from the archive graph")
+        return [item["concept"] for item in neighbours]
+    
+    def _prefill_for_answer(self, answer: str, topic: Dict[str, Any], prefill: List[str], discipline: str) -> List[str]:
+        """
+        Prefill matching the answer the model actually wrote.
+        
+        When it strayed from the assigned topic, the graph neighbours of its
+        own answer are used if the graph knows enough of them; otherwise the
+        topic's neighbours (a closely related differential) still fill in.
+        """
+        if normalize_answer(answer) == normalize_answer(topic["answer"]):
+            return prefill
+        return self._prefill_concepts({"answer": answer}, discipline) or prefill
+    
+    def _apply_prefill(self, puzzle: Dict[str, Any], prefill: List[str], selection_result: Dict[str, Any]):
+        """Combine prefilled and model-written concepts, dropping any that would count as the answer."""
+        generated = puzzle.get("concepts", [])
+        puzzle["concepts"] = merge_concepts(puzzle["answer"], puzzle.get("acceptable_answers", []), prefill, generated)
+        selection_result["prefilled_concepts"] = len(prefill)
+    
+    async def regenerate_tiles(self, puzzle: Dict[str, Any], tile_indices: List[int], notes: str = None) -> Dict[str, Any]:
+        """
+        Regenerate selected tiles (clue and explanation) of an existing puzzle.
+        
+        The rest of the puzzle is sent as fixed context and each tile keeps its
+        difficulty slot, so a fix costs a small fraction of a full generation.
+        """
+        tiles = puzzle.get("tiles", [])
+        indices = sorted(set(tile_indices))
+        for index in indices:
+            if not 0 <= index < len(tiles):
+                raise ValueError(f"Tile index {index} out of range (0-{len(tiles) - 1})")
+        if not indices:
+            raise ValueError("No tiles selected for regeneration")
+        
+        self.logger.info(f"Regenerating tiles: {[i + 1 for i in indices]}")
+        prompt = self._get_tile_regeneration_prompt(puzzle, indices, notes)
+        max_tokens = config.TILE_REGEN_BASE_TOKENS + config.TILE_REGEN_TOKENS_PER_TILE * len(indices)
+        
+        content, _ = await self._complete(prompt, max_tokens)
+        replacements = self._parse_json_response(content)
+        
+        updated = copy.deepcopy(puzzle)
+        new_tiles = replacements.get("tiles", {})
+        for index in indices:
+            replacement = new_tiles.get(str(index))
+            if not isinstance(replacement, dict) or not replacement.get("clue") or not replacement.get("explanation"):
+                raise ValueError(f"Regenerated content missing for tile {index + 1}")
+            updated["tiles"][index]["clue"] = replacement["clue"]
+            updated["explanations"][f"tile_{index}"] = replacement["explanation"]
+        
+        if not self.validate_puzzle(updated):
+            raise ValueError("Puzzle failed validation after tile regeneration")
+        
+        self.logger.info(f"✅ Regenerated {len(indices)} tile(s)")
+        return updated
+    
+    async def _salvage_explanations(self, puzzle: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fill explanations lost from a repaired response with one small tile request.
+        
+        Only applies when the rest of the board survived intact; otherwise the
+        puzzle is returned as-is and validation decides its fate.
+        """
+        tiles = puzzle.get("tiles")
+        if not isinstance(tiles, list) or len(tiles) != 9 or "answer" not in puzzle or "concepts" not in puzzle:
+            return puzzle
+        if any(not isinstance(tile, dict) or "clue" not in tile or "difficulty" not in tile for tile in tiles):
+            return puzzle
+        
+        explanations = puzzle.setdefault("explanations", {})
+        missing = [i for i in range(9) if not explanations.get(f"tile_{i}")]
+        if not missing:
+            return puzzle
+        
+        self.logger.warning(f"🩹 Salvaging truncated response: regenerating tiles {[i + 1 for i in missing]}")
+        return await self.regenerate_tiles(puzzle, missing, notes="The previous explanation was cut off")
+    
+    def _get_core_prompt(self, discipline: str, category: str, date: str, topic: str = None,
+                         prefill: List[str] = None) -> str:
+        """Prompt for the content every track shares: answer, synonyms and differential."""
+        return f"""Choose the answer for today's puzzle in "The Differential" medical diagnosis game.
+
+Discipline: {discipline}
+Category: {category}
+Date: {date}
+Instructions: {self._get_category_instructions(category, discipline, topic, prefill)}
+
+Several versions of the puzzle (from medical student to attending level) will be built on this answer.
+
+Return only JSON:
+{{
+  "topic_rationale": "Why this answer is educationally valuable",
+  "answer": "Specific Answer",
+  "acceptable_answers": ["Primary Answer", "Abbreviation", "Alternative name"],
+  "concepts": ["Primary Answer", "Differential 1", "Differential 2", "... {config.MIN_CONCEPTS}-{config.MAX_CONCEPTS} total"]
+}}"""
+    
+    def _get_track_prompt(self, base: Dict[str, Any], track: str) -> str:
+        """Tile prompt for one track; the shared part comes first so it can be cached across tracks."""
+        easy, medium, hard = (config.REQUIRED_TILE_COUNTS[d] for d in ("easy", "medium", "hard"))
+        return f"""Write the tiles for a puzzle in "The Differential" medical diagnosis game.
+
+Answer: {base['answer']}
+Also accepted: {', '.join(base['acceptable_answers'])}
+Discipline: {base['discipline']}
+Category: {base['category']}
+Differential shown to players: {', '.join(base['concepts'])}
+
+Rules:
+- Exactly 9 tiles in this order: {easy} easy, {medium} medium, {hard} hard
+- Each clue must be ≤{config.MAX_CLUE_LENGTH} characters
+- Easy tiles are obvious but nonspecific findings; hard tiles are the most diagnostically valuable
+- Each explanation is 50-150 words connecting the clue to {base['answer']}
+
+Audience: {track} - {config.AUDIENCE_TRACKS[track]}
+
+Return only JSON:
+{{
+  "tiles": [{{"difficulty": "easy", "clue": "..."}}, ...],
+  "explanations": {{"tile_0": "...", ..., "tile_8": "..."}}
+}}"""
+    
+    def _get_tile_regeneration_prompt(self, puzzle: Dict[str, Any], indices: List[int], notes: str = None) -> str:
+        """Small prompt asking for replacement tiles with the rest of the puzzle as context."""
+        difficulty_guidance = {
+            "easy": "obvious, general finding with low diagnostic specificity",
+            "medium": "supportive finding that narrows the differential",
+            "hard": "expert-level, near-pathognomonic finding"
+        }
+        
+        board = []
+        for i, tile in enumerate(puzzle["tiles"]):
+            marker = "REPLACE" if i in indices else "keep"
+            board.append(f"  {i}. [{tile['difficulty']}] {tile['clue']} ({marker})")
+        
+        requests = []
+        for i in indices:
+            difficulty = puzzle["tiles"][i]["difficulty"]
+            requests.append(f"  {i}. {difficulty}: {difficulty_guidance.get(difficulty, difficulty)}")
+        
+        example = ", ".join(
+            f'"{i}": {{"clue": "...", "explanation": "..."}}' for i in indices
+        )
+        notes_line = f"\nEditor notes: {notes}\n" if notes else ""
+        
+        return f"""Revise tiles of an existing puzzle for "The Differential" medical diagnosis game.
+
+Answer: {puzzle.get('answer')}
+Discipline: {puzzle.get('discipline', 'Unknown')}
+Category: {puzzle.get('category', 'Unknown')}
+
+Current board (tile number, difficulty, clue):
+{chr(10).join(board)}
+
+Write new tiles for these slots only, keeping each slot's difficulty:
+{chr(10).join(requests)}
+{notes_line}
+Rules:
+- Each clue must be ≤{config.MAX_CLUE_LENGTH} characters and must not repeat information from the kept tiles
+- Each explanation is 50-150 words connecting the clue to {puzzle.get('answer')}
+
+Return only JSON: {{"tiles": {{{example}}}}}"""
+    
+    def _load_focused_prompt(self, discipline: str, category: str, rationale: str, date: str = None,
+                             topic: str = None, prefill: List[str] = None) -> str:
+        """Render the focused prompt for a specific discipline and category (and assigned topic)."""
+        date = date or config.DEFAULT_DATE
+        try:
+            prompt_content = self.prompt_template.render(
+                DISCIPLINE=discipline,
+                CATEGORY=category,
+                SPECIFIC_INSTRUCTIONS=self._get_category_instructions(category, discipline, topic, prefill),
+                DATE=date
+            )
         except FileNotFoundError:
             # Fallback to simple prompt if file not found
-            return self._get_focused_fallback_prompt(discipline, category)
+            prompt_content = self._get_focused_fallback_prompt(discipline, category, date, topic, prefill)
+            self.last_prompt_report = None
+            return prompt_content
+        
+        self.last_prompt_report = self.prompt_template.token_report(prompt_content)
+        report = self.last_prompt_report
+        self.logger.info(
+            f"📏 Prompt: {report['total_tokens']} tokens "
+            f"({report['prefix_tokens']} stable prefix, {report['variable_tokens']} per-puzzle"
+            f"{'' if report['exact'] else ', estimated'})"
+        )
+        return prompt_content
+    
+    async def _complete(self, prompt: str, max_tokens: int):
+        """
+        Get the full completion text for a prompt, continuing truncated output.
+        
+        A finish_reason of "length" is answered with a continuation request
+        (the partial text sent back as the assistant turn) rather than a
+        restart. Returns (text, completion tokens used across all requests).
+        """
+        response = await self._chat_completion(prompt, max_tokens)
+        choice = response.choices[0]
+        parts = [choice.message.content or ""]
+        completion_tokens = self._completion_tokens(response, parts[0])
+        
+        continuations = 0
+        while getattr(choice, "finish_reason", None) == "length" and continuations < config.MAX_CONTINUATIONS:
+            continuations += 1
+            self.logger.warning(f"✂️  Completion hit max_tokens ({max_tokens}); continuing ({continuations}/{config.MAX_CONTINUATIONS})")
+            history = [
+                {"role": "assistant", "content": "".join(parts)},
+                {"role": "user", "content": "Continue exactly where you stopped. Do not repeat anything or add commentary."}
+            ]
+            response = await self._chat_completion(prompt, max_tokens, history)
+            choice = response.choices[0]
+            text = self._strip_leading_fence(choice.message.content or "")
+            parts.append(text)
+            completion_tokens += self._completion_tokens(response, text)
+        
+        if getattr(choice, "finish_reason", None) == "length":
+            self.logger.warning("✂️  Completion still truncated after continuations; repairing what arrived")
+        return "".join(parts).strip(), completion_tokens
+    
+    def _completion_tokens(self, response, text: str) -> int:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            return usage.completion_tokens
+        return count_tokens(text, self.model)
+    
+    @staticmethod
+    def _strip_leading_fence(text: str) -> str:
+        """Drop a markdown fence the model re-opens at the start of a continuation."""
+        if text.lstrip().startswith("```"):
+            newline = text.find("\n")
+            return text[newline + 1:] if newline != -1 else ""
+        return text
     
-    def _get_category_instructions(self, category: str, discipline: str) -> str:
+    async def _chat_completion(self, prompt: str, max_tokens: int, history: List[Dict[str, str]] = None):
+        """Send one chat request through the shared rate limiter."""
+        messages = [
+            {"role": "system", "content": config.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ] + (history or [])
+        estimated_tokens = self._estimate_request_tokens(messages, max_tokens)
+        await self.rate_limiter.acquire(estimated_tokens)
+        
+        self.logger.info(f"Calling OpenAI API with model: {self.model}")
+        # Async client: concurrent generations overlap and cancelling the task aborts the request
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=max_tokens
+        )
+        self.logger.info("Received response from OpenAI")
+        
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.rate_limiter.reconcile(estimated_tokens, usage.total_tokens)
+        self._log_usage(response)
+        return response
+    
+    def _estimate_request_tokens(self, messages, max_tokens: int) -> int:
+        """Upper-bound token cost of a request: prompt plus the completion allowance."""
+        prompt_tokens = sum(count_tokens(m["content"], self.model) for m in messages)
+        # Chat formatting adds a few tokens per message
+        return prompt_tokens + 4 * len(messages) + max_tokens
+    
+    def _log_usage(self, response):
+        """Log token usage, including how much of the prompt the provider served from cache."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+        self.logger.info(
+            f"🧾 Usage: {usage.prompt_tokens} prompt ({cached or 0} cached), "
+            f"{usage.completion_tokens} completion tokens"
+        )
+    
+    def _get_category_instructions(self, category: str, discipline: str, topic: str = None,
+                                   prefill: List[str] = None) -> str:
         """Generate specific instructions based on category type."""
         category_details = config.PUZZLE_CATEGORIES.get(category, {})
         category_name = category_details.get("name", category)
@@ -121,18 +550,31 @@ class OpenAIPuzzleAgent(BaseAgent):
         
         instructions = f"Create a {category_name.lower()}: {category_desc}."
         
-        if category == "diagnosis":
+        if topic:
+            # Assigned by the topic agent from the catalog
+            instructions += f" The answer for this puzzle is \"{topic}\"; build every tile, concept and explanation around it."
+        elif category == "diagnosis":
             instructions += f" Choose a specific {discipline.lower()} condition that is educationally valuable and diagnostically challenging."
         elif category == "lab_test":
             instructions += f" Choose a specific diagnostic test relevant to {discipline.lower()} that requires clinical reasoning to identify."
         elif category == "adverse_event":
             instructions += f" Choose a specific drug-related adverse event within {discipline.lower()} that requires careful clinical assessment."
         
+        if topic and prefill:
+            # Most of the differential comes from the archive graph; ask only for the rest
+            wanted = max(3, config.MAX_CONCEPTS - 1 - len(prefill))
+            instructions += (
+                f" The differential already includes: {'; '.join(prefill)}."
+                f" In \"concepts\" list only \"{topic}\" followed by {wanted} further differentials not in that list."
+            )
+        
         return instructions
     
-    def _get_focused_fallback_prompt(self, discipline: str, category: str) -> str:
+    def _get_focused_fallback_prompt(self, discipline: str, category: str, date: str = None,
+                                     topic: str = None, prefill: List[str] = None) -> str:
         """Fallback prompt if the focused prompt file isn't found."""
-        category_instructions = self._get_category_instructions(category, discipline)
+        date = date or config.DEFAULT_DATE
+        category_instructions = self._get_category_instructions(category, discipline, topic, prefill)
         
         return f"""
         Generate medical puzzle content for "The Differential" game.
@@ -152,7 +594,7 @@ class OpenAIPuzzleAgent(BaseAgent):
         
         Return valid JSON in this exact format:
         {{
-          "date": "{config.DEFAULT_DATE}",
+          "date": "{date}",
           "discipline": "{discipline}",
           "category": "{category}",
           "topic_rationale": "Why this topic was chosen",
@@ -185,21 +627,26 @@ class OpenAIPuzzleAgent(BaseAgent):
         """
     
     def _parse_json_response(self, content: str) -> Dict[str, Any]:
-        """Parse and clean JSON response from OpenAI."""
-        # Remove any markdown formatting
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.endswith('```'):
-            content = content[:-3]
-        
-        content = content.strip()
+        """
+        Extract the JSON object from an OpenAI response.
         
+        Surrounding prose and markdown fences are ignored and common defects
+        (trailing commas, truncation) are repaired; what was fixed or lost is
+        kept in last_parse_report.
+        """
         try:
-            return json.loads(content)
-        except json.JSONDecodeError as e:
+            data, report = extract_json(content)
+        except ValueError as e:
             self.logger.error(f"Failed to parse JSON: {e}")
             self.logger.error(f"Raw content: {content[:500]}...")
             raise ValueError(f"Invalid JSON response from OpenAI: {e}")
+        
+        self.last_parse_report = report
+        if report.repairs:
+            self.logger.warning(f"🩹 Repaired JSON response: {'; '.join(report.repairs)}")
+        if report.lost:
+            self.logger.warning(f"⚠️  Fields lost from response: {', '.join(report.lost)}")
+        return data
     
     def validate_puzzle(self, puzzle: Dict[str, Any]) -> bool:
         """Validate that the generated puzzle meets requirements."""
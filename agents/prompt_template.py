@@ -0,0 +1,111 @@
+"""
+Compiled prompt templates for The Differential.
+Templates are parsed once, reloaded when the file changes on disk, and
+rendered in a single pass. Everything before the first placeholder is a
+stable prefix shared by every request, which providers can cache.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import tiktoken  # Optional: exact token counts
+except ImportError:
+    tiktoken = None
+
+PLACEHOLDER_PATTERN = re.compile(r"\[([A-Z_]+)_PLACEHOLDER\]")
+
+# Rough characters-per-token ratio for English prose when tiktoken is absent
+CHARS_PER_TOKEN = 4.0
+
+_encoders: Dict[str, Any] = {}
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count tokens with tiktoken when available, otherwise estimate."""
+    if tiktoken is not None:
+        key = model or "default"
+        encoder = _encoders.get(key)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                encoder = tiktoken.get_encoding("cl100k_base")
+            _encoders[key] = encoder
+        return len(encoder.encode(text))
+    return int(len(text) / CHARS_PER_TOKEN + 0.5)
+
+
+class PromptTemplate:
+    """A prompt file with [NAME_PLACEHOLDER] slots, compiled for fast rendering."""
+
+    def __init__(self, path: str, placeholders: List[str], model: Optional[str] = None):
+        self.path = path
+        self.placeholders = set(placeholders)
+        self.model = model
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._segments: List[Tuple[str, Optional[str]]] = []
+        self.prefix = ""
+        self.prefix_tokens = 0
+
+    def _compile(self, text: str):
+        found = PLACEHOLDER_PATTERN.findall(text)
+        missing = self.placeholders - set(found)
+        unknown = set(found) - self.placeholders
+        if missing:
+            raise ValueError(f"Prompt template '{self.path}' is missing placeholders: {sorted(missing)}")
+        if unknown:
+            raise ValueError(f"Prompt template '{self.path}' has unknown placeholders: {sorted(unknown)}")
+
+        # Alternating (literal, placeholder-name) segments for single-pass rendering
+        segments = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            segments.append((text[position:match.start()], match.group(1)))
+            position = match.end()
+        segments.append((text[position:], None))
+
+        self._segments = segments
+        self.prefix = segments[0][0]
+        self.prefix_tokens = count_tokens(self.prefix, self.model)
+
+    def _ensure_loaded(self):
+        """Load the template, or reload it if the file changed since last use."""
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._compile(f.read())
+            self._mtime = mtime
+
+    def render(self, **values: str) -> str:
+        """Fill every placeholder; raises FileNotFoundError if the template is gone."""
+        self._ensure_loaded()
+        missing = self.placeholders - set(values)
+        if missing:
+            raise ValueError(f"No value provided for placeholders: {sorted(missing)}")
+
+        parts = []
+        for literal, name in self._segments:
+            parts.append(literal)
+            if name is not None:
+                parts.append(str(values[name]))
+        return "".join(parts)
+
+    def token_report(self, rendered: str) -> Dict[str, Any]:
+        """Split a rendered prompt's size into cacheable prefix and variable tail."""
+        self._ensure_loaded()
+        total = count_tokens(rendered, self.model)
+        return {
+            "total_tokens": total,
+            "prefix_tokens": self.prefix_tokens,
+            "variable_tokens": max(0, total - self.prefix_tokens),
+            "prefix_ratio": self.prefix_tokens / total if total else 0.0,
+            "exact": tiktoken is not None
+        }
@@ -0,0 +1,172 @@
+"""
+Shared rate limiting for The Differential generation agents.
+Token buckets for requests-per-minute and tokens-per-minute live in a small
+state file guarded by an exclusive file lock, so every generator process on
+the machine (cron backfills, the daily run) draws from the same budget.
+Waiters are served first-come first-served by ticket number.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process limiter
+    fcntl = None
+
+# How often a queued request re-checks the shared state
+POLL_INTERVAL = 0.05
+# A waiter that has not checked in for this long is assumed to have died
+STALE_TICKET_SECONDS = 30.0
+# Bucket capacity as seconds of refill; small bursts keep the rate smooth
+BURST_SECONDS = 10.0
+
+
+class SharedRateLimiter:
+    """Fair, cross-process token-bucket limiter for RPM and TPM budgets."""
+
+    def __init__(self, state_file: str, requests_per_minute: float, tokens_per_minute: float,
+                 target_utilization: float = 0.9, max_request_tokens: int = 0):
+        self.state_file = state_file
+        self.lock_file = state_file + ".lock"
+        self.logger = logging.getLogger("differential.rate_limiter")
+        self._thread_lock = threading.Lock()
+
+        # Run just under the provider limits so we never trip them
+        self.rates = {
+            "requests": requests_per_minute * target_utilization / 60.0,
+            "tokens": tokens_per_minute * target_utilization / 60.0
+        }
+        self.capacities = {name: rate * BURST_SECONDS for name, rate in self.rates.items()}
+        # The token bucket must hold the largest request, or every big call waits for a full
+        # refill and then leaves a debt; it never holds more than one minute of budget
+        self.capacities["tokens"] = min(max(self.capacities["tokens"], max_request_tokens),
+                                        self.rates["tokens"] * 60.0)
+
+        if fcntl is None:
+            self.logger.warning("fcntl unavailable; rate limiting is per-process only")
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield the shared state dict under an exclusive lock, saving it on exit."""
+        with self._thread_lock:
+            with open(self.lock_file, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    state = self._read_state()
+                    yield state
+                    self._write_state(state)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            now = time.time()
+            return {
+                "buckets": {
+                    name: {"level": capacity, "updated": now}
+                    for name, capacity in self.capacities.items()
+                },
+                "next_ticket": 0,
+                "serving": 0,
+                "waiting": {}
+            }
+
+    def _write_state(self, state: Dict[str, Any]):
+        temp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.state_file)
+
+    def _refill(self, state: Dict[str, Any], now: float):
+        for name, bucket in state["buckets"].items():
+            elapsed = max(0.0, now - bucket["updated"])
+            bucket["level"] = min(self.capacities[name], bucket["level"] + elapsed * self.rates[name])
+            bucket["updated"] = now
+
+    def _skip_abandoned(self, state: Dict[str, Any], now: float):
+        """Advance past tickets whose owners stopped checking in."""
+        waiting = state["waiting"]
+        while state["serving"] < state["next_ticket"]:
+            last_seen = waiting.get(str(state["serving"]))
+            if last_seen is not None and now - last_seen < STALE_TICKET_SECONDS:
+                break
+            waiting.pop(str(state["serving"]), None)
+            state["serving"] += 1
+
+    def _try_take(self, state: Dict[str, Any], ticket: int, tokens: int, now: float) -> float:
+        """Take budget for `ticket` if it is its turn; return seconds to wait (0 = granted)."""
+        waiting = state["waiting"]
+        waiting[str(ticket)] = now
+        self._refill(state, now)
+        self._skip_abandoned(state, now)
+
+        if state["serving"] != ticket:
+            return POLL_INTERVAL
+
+        cost = {"requests": 1, "tokens": tokens}
+        wait = 0.0
+        for name, amount in cost.items():
+            # Requests larger than the bucket go through once it is full, leaving a debt
+            needed = min(amount, self.capacities[name])
+            deficit = needed - state["buckets"][name]["level"]
+            if deficit > 0:
+                wait = max(wait, deficit / self.rates[name])
+        if wait > 0:
+            return wait
+
+        for name, amount in cost.items():
+            state["buckets"][name]["level"] -= amount
+        waiting.pop(str(ticket), None)
+        state["serving"] += 1
+        return 0.0
+
+    async def acquire(self, tokens: int):
+        """Wait for a slot for one request expected to consume `tokens` tokens."""
+        with self._locked_state() as state:
+            ticket = state["next_ticket"]
+            state["next_ticket"] += 1
+            state["waiting"][str(ticket)] = time.time()
+
+        started = time.time()
+        granted = False
+        try:
+            while True:
+                with self._locked_state() as state:
+                    wait = self._try_take(state, ticket, tokens, time.time())
+                if wait == 0.0:
+                    granted = True
+                    break
+                # Check in well before the stale timeout while waiting
+                await asyncio.sleep(min(wait, STALE_TICKET_SECONDS / 3))
+        finally:
+            if not granted:
+                # Cancelled or failed: give up the place in line so later tickets are not held back
+                with self._locked_state() as state:
+                    state["waiting"].pop(str(ticket), None)
+                    self._skip_abandoned(state, time.time())
+
+        waited = time.time() - started
+        if waited > 1.0:
+            self.logger.info(f"⏳ Rate limiter held request for {waited:.1f}s ({tokens} tokens)")
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Return over-estimated tokens to the bucket (or charge the shortfall)."""
+        difference = estimated_tokens - actual_tokens
+        if difference == 0:
+            return
+        with self._locked_state() as state:
+            self._refill(state, time.time())
+            bucket = state["buckets"]["tokens"]
+            bucket["level"] = min(self.capacities["tokens"], bucket["level"] + difference)
@@ -0,0 +1,185 @@
+"""
+Topic selection agent for The Differential.
+Picks a concrete answer for a discipline and category from a local catalog
+(topic_catalog.json), skipping answers already published or queued, so
+the generation agent is never asked for a repeat. Drafts that were never
+published do not count.
+"""
+
+import re
+import os
+import sys
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from .base_agent import BaseAgent
+import config
+
+# Add parent directory to path for puzzle_archive import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import puzzle_archive
+from discipline_selector import slot_probability
+
+_APOSTROPHES = re.compile(r"['‘’]")
+_PUNCTUATION = re.compile(r"[^\w\s]", re.ASCII)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_answer(answer: str) -> str:
+    """Normalize an answer exactly like normalizeAnswer() in js/game.js."""
+    if not answer:
+        return ""
+    text = _APOSTROPHES.sub("", answer.lower())
+    text = _PUNCTUATION.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:  # Removed since it was listed
+        return None
+
+
+class TopicAgent(BaseAgent):
+    """Agent that selects an unused catalog topic for a discipline and category."""
+
+    def __init__(self, catalog_path: str = config.TOPIC_CATALOG_FILE,
+                 cooldown_days: int = config.TOPIC_COOLDOWN_DAYS):
+        super().__init__("Topic Selector")
+        self.catalog_path = catalog_path
+        self.cooldown_days = cooldown_days
+        self.rng = random.Random()
+        self.index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.last_used: Dict[str, str] = {}
+        self.reserved: Dict[str, str] = {}
+        self._catalog_mtime: Optional[float] = None
+        self._usage_signature = None
+
+    def _load_catalog(self):
+        """(Re)build the (discipline, category) index when the catalog file changes."""
+        mtime = os.stat(self.catalog_path).st_mtime
+        if mtime == self._catalog_mtime:
+            return
+        with open(self.catalog_path, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+
+        index = {}
+        for discipline, categories in catalog.get("topics", {}).items():
+            for category, entries in categories.items():
+                topics = []
+                for entry in entries:
+                    if isinstance(entry, str):
+                        entry = {"answer": entry}
+                    names = [entry["answer"]] + entry.get("aliases", [])
+                    topics.append({
+                        "answer": entry["answer"],
+                        "keys": {normalize_answer(name) for name in names}
+                    })
+                index[(discipline, category)] = topics
+        self.index = index
+        self._catalog_mtime = mtime
+        self.logger.info(f"📚 Loaded {sum(len(t) for t in index.values())} catalog topics")
+
+    def _refresh_usage(self):
+        """Rebuild answer → last-used date from published and queued puzzles when they change."""
+        published = puzzle_archive.published_files()
+        queued = puzzle_archive.queued_dates()
+        live_mtime = os.path.getmtime(config.OUTPUT_FILE) if os.path.exists(config.OUTPUT_FILE) else None
+        # Any record may be rewritten (a date re-published or re-queued), so track every file's mtime
+        paths = published + [puzzle_archive.queued_path(date) for date in queued]
+        signature = (tuple(paths), tuple(_mtime(path) for path in paths), live_mtime)
+        if signature == self._usage_signature:
+            return
+
+        puzzles = puzzle_archive.load_published_puzzles()
+        for date in queued:
+            queued_puzzle = puzzle_archive.peek_queued(date)
+            if queued_puzzle is not None:
+                puzzles.append(queued_puzzle)
+
+        last_used = {}
+        for puzzle in puzzles:
+            date = puzzle.get("date", "")
+            for name in [puzzle.get("answer")] + puzzle.get("acceptable_answers", []):
+                key = normalize_answer(name)
+                if key and date > last_used.get(key, ""):
+                    last_used[key] = date
+        self.last_used = last_used
+        self._usage_signature = signature
+
+    def topic_status(self, topic: Dict[str, Any], cutoff: str) -> Tuple[str, str]:
+        """Return ("unused" | "cooled_down" | "cooldown", last used date) for a catalog topic."""
+        last = max(max(self.last_used.get(key, ""), self.reserved.get(key, "")) for key in topic["keys"])
+        if not last:
+            return "unused", ""
+        return ("cooled_down" if last < cutoff else "cooldown"), last
+
+    def cooldown_for(self, discipline: str, category: str) -> int:
+        """
+        Cooldown in days for one slot, scaled to its catalog size.
+
+        A slot drawn on a fraction p of days with n topics works through its
+        catalog in about n / p days; a longer cooldown would leave it empty.
+        """
+        size = len(self.index.get((discipline, category), []))
+        probability = slot_probability(discipline, category)
+        if not size or probability <= 0:
+            return self.cooldown_days
+        return max(1, min(self.cooldown_days, int(size / probability * config.TOPIC_COOLDOWN_CATALOG_SHARE)))
+
+    def available_topics(self, discipline: str, category: str, date: str = None) -> List[Dict[str, Any]]:
+        """Catalog topics usable on `date`, never-used ones first, then least recently used."""
+        self._load_catalog()
+        self._refresh_usage()
+        date = date or config.DEFAULT_DATE
+        cooldown = self.cooldown_for(discipline, category)
+        cutoff = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=cooldown)).strftime("%Y-%m-%d")
+
+        available = []
+        for topic in self.index.get((discipline, category), []):
+            status, last = self.topic_status(topic, cutoff)
+            if status != "cooldown":
+                available.append({"answer": topic["answer"], "status": status, "last_used": last or None})
+        available.sort(key=lambda t: (t["status"] != "unused", t["last_used"] or ""))
+        return available
+
+    def select_topic(self, discipline: str, category: str, date: str = None,
+                     rng: Optional[random.Random] = None) -> Optional[Dict[str, Any]]:
+        """
+        Pick a topic and reserve it so concurrent generations don't repeat it.
+
+        Chooses at random among never-used topics, otherwise the least recently
+        used topic past its cooldown. Returns None when the catalog is exhausted.
+        """
+        available = self.available_topics(discipline, category, date)
+        if not available:
+            size = len(self.index.get((discipline, category), []))
+            reason = (f"all {size} topics used in the last {self.cooldown_for(discipline, category)} days"
+                      if size else "no topics listed")
+            self.logger.warning(
+                f"⚠️  Topic catalog exhausted for {discipline} / {category} ({reason}); "
+                f"the model will choose the answer. Add topics to {self.catalog_path}."
+            )
+            return None
+
+        rng = rng or self.rng
+        unused = [t for t in available if t["status"] == "unused"]
+        topic = rng.choice(unused) if unused else available[0]
+        self.reserved[normalize_answer(topic["answer"])] = date or config.DEFAULT_DATE
+        self.logger.info(f"🎯 Topic: {topic['answer']} ({topic['status']}, {len(available)} available)")
+        return dict(topic, discipline=discipline, category=category)
+
+    def release_topic(self, answer: str):
+        """Drop a reservation (e.g. when the generated puzzle was rejected)."""
+        self.reserved.pop(normalize_answer(answer), None)
+
+    async def generate(self, discipline: str = None, category: str = None, date: str = None,
+                       **kwargs) -> Dict[str, Any]:
+        """Select a topic; raises ValueError when none is available."""
+        topic = self.select_topic(discipline, category, date, kwargs.get("rng"))
+        if topic is None:
+            raise ValueError(f"No available topics for {discipline} / {category}")
+        return topic
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo calibration of AUEC weight schemes for The Differential.
+Plays large batches of synthetic games on archived puzzles under
+parameterized player policies and reports how well each cost/info weight
+scheme separates good strategies from poor ones.
+
+Scoring mirrors js/auec.js: the area under the cost/info curve counts only
+tile flips, is inverse-normalized between the best path (one hard tile) and
+the worst solved path (every tile easy→hard), and failed games score 0.
+
+Usage:
+    python auec_simulator.py [--games 1000000] [--scheme clinical] [--seed 0]
+"""
+
+import json
+import argparse
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+import config
+from puzzle_archive import load_archived_puzzles
+
+# Weight schemes from getAUECConfig (js/auec.js and the legacy script.js)
+AUEC_SCHEMES = {
+    "intuitive": {
+        "costWeights": {"easy": 3, "medium": 2, "hard": 1, "wrong": 5},
+        "infoWeights": {"easy": 1, "medium": 2, "hard": 3, "wrong": 0}
+    },
+    "clinical": {
+        "costWeights": {"easy": 1, "medium": 2, "hard": 3, "wrong": 8},
+        "infoWeights": {"easy": 1, "medium": 4, "hard": 9, "wrong": 0}
+    },
+    "strategic": {
+        "costWeights": {"easy": 9, "medium": 6, "hard": 2, "wrong": 8},
+        "infoWeights": {"easy": 9, "medium": 6, "hard": 6, "wrong": 0}
+    }
+}
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+# Ground-truth diagnostic value of a revealed tile, independent of any
+# scoring scheme. Hard tiles carry the pathognomonic findings.
+TRUE_TILE_VALUE = {"easy": 0.5, "medium": 1.0, "hard": 2.0}
+
+# Player policies. `preference` orders tiles (higher = flipped sooner, with
+# `noise` jitter); the player guesses once accumulated evidence reaches
+# `threshold`; `skill` scales how much evidence turns into a correct guess.
+PLAYER_POLICIES = {
+    "hard_first": {"preference": {"easy": 0, "medium": 1, "hard": 2}, "noise": 0.3, "threshold": 4.0, "skill": 0.6},
+    "easy_first": {"preference": {"easy": 2, "medium": 1, "hard": 0}, "noise": 0.3, "threshold": 4.0, "skill": 0.6},
+    "guess_early": {"preference": {"easy": 0, "medium": 0, "hard": 0}, "noise": 1.0, "threshold": 1.0, "skill": 0.6},
+    "random": {"preference": {"easy": 0, "medium": 0, "hard": 0}, "noise": 1.0, "threshold": 4.0, "skill": 0.6},
+    "exhaustive": {"preference": {"easy": 2, "medium": 1, "hard": 0}, "noise": 0.3, "threshold": 99.0, "skill": 0.6}
+}
+
+MAX_GUESSES = 3
+
+# A pair of strategies whose score distributions differ by less than this
+# standardized effect size is treated as indistinguishable.
+MIN_SEPARATION = 0.2
+# Ordering agreement (Kendall tau) with the reference outcome below this is degenerate
+MIN_RANK_AGREEMENT = 0.6
+
+
+def scheme_arrays(scheme: Dict[str, Any], difficulties: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Per-tile cost and info vectors for a puzzle's tile layout."""
+    cost = np.array([scheme["costWeights"][d] for d in DIFFICULTIES], dtype=float)[difficulties]
+    info = np.array([scheme["infoWeights"][d] for d in DIFFICULTIES], dtype=float)[difficulties]
+    return cost, info, float(scheme["costWeights"]["wrong"])
+
+
+def area_bounds(scheme: Dict[str, Any], difficulties: np.ndarray) -> Tuple[float, float]:
+    """Best and worst solved-path areas, as calculateMaxArea/calculateMinArea compute them."""
+    cost_w, info_w = scheme["costWeights"], scheme["infoWeights"]
+    best = cost_w["hard"] * info_w["hard"] / 2.0
+
+    worst = 0.0
+    y = 0.0
+    for index in np.argsort(difficulties, kind="stable"):
+        difficulty = DIFFICULTIES[difficulties[index]]
+        worst += cost_w[difficulty] * (2 * y + info_w[difficulty]) / 2.0
+        y += info_w[difficulty]
+    return best, worst
+
+
+def simulate_batch(difficulties: np.ndarray, policy: Dict[str, Any], schemes: Dict[str, Dict[str, Any]],
+                   n_games: int, rng: np.random.Generator) -> Dict[str, Any]:
+    """Play n_games under one policy and score them under every scheme."""
+    n_tiles = len(difficulties)
+
+    # Flip order per game: sort tiles by noisy preference
+    preference = np.array([policy["preference"][d] for d in DIFFICULTIES], dtype=float)[difficulties]
+    keys = preference[None, :] + rng.normal(0.0, policy["noise"], size=(n_games, n_tiles))
+    order = np.argsort(-keys, axis=1)
+
+    # Evidence after k flips (k = 0..n_tiles)
+    value = np.array([TRUE_TILE_VALUE[d] for d in DIFFICULTIES])[difficulties]
+    evidence = np.zeros((n_games, n_tiles + 1))
+    evidence[:, 1:] = np.cumsum(value[order], axis=1)
+
+    # First guess once evidence reaches a per-player threshold (at least one flip)
+    threshold = policy["threshold"] * rng.uniform(0.75, 1.25, size=n_games)
+    reached = evidence[:, 1:] >= threshold[:, None]
+    flips = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, n_tiles)
+
+    won = np.zeros(n_games, dtype=bool)
+    wrong = np.zeros(n_games, dtype=int)
+    active = np.ones(n_games, dtype=bool)
+    rows = np.arange(n_games)
+    for attempt in range(MAX_GUESSES):
+        p_correct = 1.0 - np.exp(-policy["skill"] * evidence[rows, flips])
+        correct = active & (rng.random(n_games) < p_correct)
+        won |= correct
+        missed = active & ~correct
+        wrong += missed
+        active = missed
+        # After a miss, reveal one more tile before guessing again
+        flips = np.where(active, np.minimum(flips + 1, n_tiles), flips)
+
+    results = {
+        "won": won,
+        "flips": flips,
+        "wrong": wrong,
+        "scores": {}
+    }
+    for name, scheme in schemes.items():
+        cost, info, _ = scheme_arrays(scheme, difficulties)
+        step_cost = cost[order]
+        step_info = info[order]
+        cum_info = np.cumsum(step_info, axis=1)
+        prev_info = cum_info - step_info
+        step_area = step_cost * (prev_info + cum_info) / 2.0
+        area = np.zeros((n_games, n_tiles + 1))
+        area[:, 1:] = np.cumsum(step_area, axis=1)
+        user_area = area[rows, flips]
+
+        best, worst = area_bounds(scheme, difficulties)
+        if worst > best:
+            score = np.clip((worst - user_area) / (worst - best), 0.0, 1.0)
+        else:
+            score = np.zeros(n_games)
+        results["scores"][name] = np.where(won, score, 0.0)
+    return results
+
+
+class RunningStats:
+    """Streaming mean/variance (Chan's parallel update) over batches."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        delta = batch_mean - self.mean
+        total = self.n + n
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+
+def kendall_tau(order_a: List[str], order_b: List[str]) -> float:
+    """Kendall rank correlation between two orderings of the same items."""
+    position = {item: i for i, item in enumerate(order_b)}
+    concordant = discordant = 0
+    for i in range(len(order_a)):
+        for j in range(i + 1, len(order_a)):
+            if position[order_a[i]] < position[order_a[j]]:
+                concordant += 1
+            else:
+                discordant += 1
+    pairs = concordant + discordant
+    return (concordant - discordant) / pairs if pairs else 1.0
+
+
+class AUECSimulator:
+    """Runs policies against puzzles and summarizes scheme behaviour."""
+
+    def __init__(self, schemes: Dict[str, Dict[str, Any]] = None, policies: Dict[str, Dict[str, Any]] = None,
+                 seed: int = 0, batch_size: int = 100_000):
+        self.schemes = schemes or AUEC_SCHEMES
+        self.policies = policies or PLAYER_POLICIES
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+
+    def run(self, puzzles: List[Dict[str, Any]], games_per_puzzle: int) -> Dict[str, Any]:
+        score_stats = {s: {p: RunningStats() for p in self.policies} for s in self.schemes}
+        saturated = {s: {p: 0 for p in self.policies} for s in self.schemes}
+        # Reference outcome: solved, with fewer tiles revealed being better
+        outcome_stats = {p: RunningStats() for p in self.policies}
+        win_counts = {p: 0 for p in self.policies}
+        games = {p: 0 for p in self.policies}
+
+        for puzzle in puzzles:
+            difficulties = np.array([DIFFICULTIES.index(t["difficulty"]) for t in puzzle["tiles"]])
+            n_tiles = len(difficulties)
+            for policy_name, policy in self.policies.items():
+                remaining = games_per_puzzle
+                while remaining > 0:
+                    n = min(self.batch_size, remaining)
+                    remaining -= n
+                    batch = simulate_batch(difficulties, policy, self.schemes, n, self.rng)
+
+                    outcome = np.where(batch["won"], 1.0 - (batch["flips"] - 1) / n_tiles, 0.0)
+                    outcome_stats[policy_name].update(outcome)
+                    win_counts[policy_name] += int(batch["won"].sum())
+                    games[policy_name] += n
+                    for scheme_name, scores in batch["scores"].items():
+                        score_stats[scheme_name][policy_name].update(scores)
+                        won_scores = scores[batch["won"]]
+                        saturated[scheme_name][policy_name] += int((won_scores >= 1.0).sum())
+
+        reference_order = sorted(self.policies, key=lambda p: -outcome_stats[p].mean)
+        report = {
+            "puzzles": len(puzzles),
+            "games_per_policy": games,
+            "reference_order": reference_order,
+            "policies": {
+                p: {"win_rate": win_counts[p] / games[p], "outcome": outcome_stats[p].mean}
+                for p in self.policies
+            },
+            "schemes": {}
+        }
+
+        for scheme_name in self.schemes:
+            stats = score_stats[scheme_name]
+            order = sorted(self.policies, key=lambda p: -stats[p].mean)
+            separation = {}
+            flags = []
+            for i, a in enumerate(order):
+                for b in order[i + 1:]:
+                    pooled = ((stats[a].std ** 2 + stats[b].std ** 2) / 2) ** 0.5
+                    d = (stats[a].mean - stats[b].mean) / pooled if pooled > 0 else 0.0
+                    separation[f"{a} > {b}"] = d
+                    if abs(d) < MIN_SEPARATION:
+                        flags.append(f"'{a}' and '{b}' are indistinguishable (d={d:.2f})")
+
+            tau = kendall_tau(order, reference_order)
+            if tau < MIN_RANK_AGREEMENT:
+                flags.append(f"ordering disagrees with reference outcome (tau={tau:.2f})")
+            for p in self.policies:
+                wins = win_counts[p]
+                if wins and saturated[scheme_name][p] / wins > 0.5:
+                    flags.append(f"'{p}' scores saturate at 100% in {saturated[scheme_name][p] / wins:.0%} of wins")
+
+            report["schemes"][scheme_name] = {
+                "order": order,
+                "mean": {p: stats[p].mean for p in self.policies},
+                "std": {p: stats[p].std for p in self.policies},
+                "separation": separation,
+                "rank_agreement": tau,
+                "degenerate": bool(flags),
+                "flags": flags
+            }
+        return report
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human-readable calibration report."""
+    print(f"🧩 Puzzles: {report['puzzles']}")
+    print(f"🎲 Games per policy: {max(report['games_per_policy'].values()):,}")
+    print(f"🏁 Reference order: {' > '.join(report['reference_order'])}")
+    for policy, info in report["policies"].items():
+        print(f"   {policy:12} win rate {info['win_rate']:.1%}, outcome {info['outcome']:.3f}")
+
+    for scheme_name, scheme in report["schemes"].items():
+        status = "⚠️  DEGENERATE" if scheme["degenerate"] else "✅ OK"
+        print(f"\n📊 Scheme '{scheme_name}': {status} (rank agreement {scheme['rank_agreement']:.2f})")
+        for policy in scheme["order"]:
+            print(f"   {policy:12} {scheme['mean'][policy] * 100:6.1f}% ± {scheme['std'][policy] * 100:5.1f}")
+        for flag in scheme["flags"]:
+            print(f"   • {flag}")
+
+
+def main():
+    """Command-line interface for the AUEC calibration simulator."""
+    parser = argparse.ArgumentParser(description="Calibrate AUEC weight schemes with synthetic games")
+    parser.add_argument('--games', type=int, default=1_000_000, help='Games per policy per puzzle')
+    parser.add_argument('--scheme', action='append', choices=list(AUEC_SCHEMES.keys()),
+                        help='Scheme to evaluate (repeatable; default: all)')
+    parser.add_argument('--scheme-file', help='JSON file with extra {name: {costWeights, infoWeights}} schemes')
+    parser.add_argument('--archive', default=config.BACKUP_DIR, help='Archive directory to draw puzzles from')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    schemes = {name: AUEC_SCHEMES[name] for name in (args.scheme or AUEC_SCHEMES)}
+    if args.scheme_file:
+        with open(args.scheme_file, "r") as f:
+            schemes.update(json.load(f))
+
+    puzzles = load_archived_puzzles(args.archive)
+    if not puzzles:
+        print("❌ No archived puzzles found")
+        return
+
+    report = AUECSimulator(schemes, seed=args.seed).run(puzzles, args.games)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("🎯 AUEC Scheme Calibration")
+        print("=" * 40)
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
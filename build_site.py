@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Static site build for The Differential.
+Bundles and minifies the game assets, content-hashes them and inlines the
+day's puzzle into index.html so first paint needs a single round trip.
+A service worker precaches the build and the recently published puzzles so
+the game works offline.
+
+Usage:
+    python build_site.py [--out dist] [--puzzle today.json] [--inline-assets] [--no-service-worker]
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import argparse
+from typing import Dict, Any, List, Optional
+
+import config
+import puzzle_archive
+
+# Scripts in the order index.html loads them. script.js is the legacy
+# single-file build and is not shipped.
+JS_SOURCES = ["js/game.js", "js/auec.js", "js/ui.js"]
+CSS_SOURCES = ["styles.css"]
+HTML_SOURCE = "index.html"
+SERVICE_WORKER_SOURCE = "js/service-worker.js"
+SERVICE_WORKER_NAME = "sw.js"
+PUZZLES_DIR = "puzzles"
+
+SERVICE_WORKER_REGISTRATION = (
+    "<script>if('serviceWorker' in navigator){window.addEventListener('load',"
+    f"()=>navigator.serviceWorker.register('{SERVICE_WORKER_NAME}'))}}</script>"
+)
+
+# Puzzle fields the game actually reads; generation metadata stays private.
+PUBLIC_PUZZLE_FIELDS = [
+    "date", "discipline", "category", "answer", "acceptable_answers",
+    "tiles", "concepts", "explanations"
+]
+
+HASH_LENGTH = 10
+
+# Tokens after which a '/' starts a regex literal rather than a division.
+_REGEX_PRECEDING_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await"
+}
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservatively minify JavaScript.
+
+    Strips comments, indentation, blank lines and redundant spaces while
+    leaving strings, template literals and regex literals untouched. Line
+    breaks are kept so automatic semicolon insertion behaves as in the source.
+    """
+    out: List[str] = []
+    i = 0
+    n = len(source)
+    last_significant = ""   # last non-whitespace token emitted
+    pending_space = False
+    pending_newline = False
+    template_depth: List[int] = []  # brace depth at each open `${`
+    brace_depth = 0
+
+    def is_ident(ch: str) -> bool:
+        return ch.isalnum() or ch in "_$" or ord(ch) > 127
+
+    def emit(text: str):
+        nonlocal pending_space, pending_newline, last_significant
+        if pending_newline and out:
+            out.append("\n")
+        elif pending_space and out and is_ident(out[-1][-1]) and is_ident(text[0]):
+            out.append(" ")
+        elif pending_space and out and out[-1][-1] in "+-" and text[0] == out[-1][-1]:
+            # Keep `a + +b` and `a - -b` from collapsing into ++/--
+            out.append(" ")
+        pending_space = pending_newline = False
+        out.append(text)
+        last_significant = text
+
+    def read_quoted(start: int, quote: str) -> int:
+        j = start + 1
+        while j < n:
+            ch = source[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == quote:
+                return j + 1
+            j += 1
+        return n
+
+    def read_template(start: int) -> int:
+        """Read a template chunk from ` or } up to the closing ` or an opening ${."""
+        j = start + 1
+        while j < n:
+            ch = source[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == "`":
+                return j + 1
+            if ch == "$" and j + 1 < n and source[j + 1] == "{":
+                return j + 2
+            j += 1
+        return n
+
+    def regex_allowed() -> bool:
+        if not last_significant:
+            return True
+        if last_significant in _REGEX_PRECEDING_KEYWORDS:
+            return True
+        return not (is_ident(last_significant[-1]) or last_significant[-1] in ")]}\"'`")
+
+    while i < n:
+        ch = source[i]
+        nxt = source[i + 1] if i + 1 < n else ""
+
+        if ch in " \t\r":
+            pending_space = True
+            i += 1
+        elif ch == "\n":
+            pending_newline = True
+            i += 1
+        elif ch == "/" and nxt == "/":
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+        elif ch == "/" and nxt == "*":
+            end = source.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            pending_space = True
+        elif ch in "'\"":
+            end = read_quoted(i, ch)
+            emit(source[i:end])
+            i = end
+        elif ch == "`":
+            end = read_template(i)
+            emit(source[i:end])
+            if source[end - 2:end] == "${":
+                template_depth.append(brace_depth)
+            i = end
+        elif ch == "}" and template_depth and template_depth[-1] == brace_depth:
+            template_depth.pop()
+            end = read_template(i)
+            emit(source[i:end])
+            if source[end - 2:end] == "${":
+                template_depth.append(brace_depth)
+            i = end
+        elif ch == "/" and regex_allowed():
+            j = i + 1
+            in_class = False
+            while j < n:
+                c = source[j]
+                if c == "\\":
+                    j += 2
+                    continue
+                if c == "[":
+                    in_class = True
+                elif c == "]":
+                    in_class = False
+                elif c == "/" and not in_class:
+                    break
+                elif c == "\n":
+                    break
+                j += 1
+            j += 1
+            while j < n and is_ident(source[j]):
+                j += 1  # flags
+            emit(source[i:j])
+            i = j
+        elif is_ident(ch):
+            j = i
+            while j < n and is_ident(source[j]):
+                j += 1
+            emit(source[i:j])
+            i = j
+        else:
+            if ch == "{":
+                brace_depth += 1
+            elif ch == "}":
+                brace_depth -= 1
+            emit(ch)
+            i += 1
+
+    return "".join(out).strip() + "\n"
+
+
+def minify_css(source: str) -> str:
+    """Strip comments and collapse whitespace in CSS, leaving strings intact."""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    result = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            result.append(part)  # quoted string
+            continue
+        part = re.sub(r"/\*.*?\*/", "", part, flags=re.S)
+        part = re.sub(r"\s+", " ", part)
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        part = re.sub(r":\s+", ":", part)
+        part = part.replace(";}", "}")
+        result.append(part)
+    return "".join(result).strip() + "\n"
+
+
+def content_hash(data: bytes) -> str:
+    """Short content hash used in asset filenames."""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(logical_name: str, data: bytes) -> str:
+    """Turn 'app.js' into 'app.<hash>.js'."""
+    stem, ext = os.path.splitext(logical_name)
+    return f"{stem}.{content_hash(data)}{ext}"
+
+
+def public_puzzle(puzzle: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a puzzle to the fields the game needs."""
+    return {field: puzzle[field] for field in PUBLIC_PUZZLE_FIELDS if field in puzzle}
+
+
+def inline_json(data: Dict[str, Any]) -> str:
+    """Serialize JSON for embedding in a <script> element."""
+    text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    # Prevent the payload from terminating the script element early
+    return text.replace("</", "<\\/")
+
+
+class SiteBuilder:
+    """Builds the deployable static site into an output directory."""
+
+    def __init__(self, root: str = ".", out_dir: str = config.BUILD_DIR):
+        self.root = root
+        self.out_dir = out_dir
+        self.manifest: Dict[str, str] = {}
+
+    def _read(self, relative_path: str) -> str:
+        with open(os.path.join(self.root, relative_path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _write_asset(self, logical_name: str, text: str) -> str:
+        data = text.encode("utf-8")
+        name = hashed_name(logical_name, data)
+        path = os.path.join(self.out_dir, "assets", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.manifest[logical_name] = f"assets/{name}"
+        return f"assets/{name}"
+
+    def bundle_js(self) -> str:
+        sources = [f"// {path}\n{self._read(path)}" for path in JS_SOURCES]
+        bundle = "\n;\n".join(sources)
+        # Bootstrap that index.html used to carry inline
+        bundle += "\n;\nnew DifferentialGame();\n"
+        return minify_js(bundle)
+
+    def bundle_css(self) -> str:
+        return minify_css("\n".join(self._read(path) for path in CSS_SOURCES))
+
+    def load_puzzle(self, puzzle_path: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.root, puzzle_path)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def render_html(self, css: str, js: str, puzzle: Optional[Dict[str, Any]],
+                    inline_assets: bool, service_worker: bool = False) -> str:
+        html = self._read(HTML_SOURCE)
+
+        # Drop the development script tags and bootstrap
+        html = re.sub(r"\s*<!-- Modular JavaScript -->", "", html)
+        html = re.sub(r'\s*<script src="js/[^"]+"></script>', "", html)
+        html = re.sub(r"\s*<script>\s*// Initialize the game.*?</script>", "", html, flags=re.S)
+
+        if inline_assets:
+            style_tag = f"<style>{css}</style>"
+            script_tag = f"<script>{js}</script>"
+            preload = ""
+        else:
+            css_path = self._write_asset("styles.css", css)
+            js_path = self._write_asset("app.js", js)
+            style_tag = f'<link rel="stylesheet" href="{css_path}">'
+            script_tag = f'<script src="{js_path}" defer></script>'
+            preload = f'<link rel="preload" href="{js_path}" as="script">\n    '
+
+        html = re.sub(r'<link rel="stylesheet" href="styles\.css">', lambda _: preload + style_tag, html)
+
+        data_tag = ""
+        if puzzle is not None:
+            data_tag = (
+                f'<script id="{config.INLINE_PUZZLE_ELEMENT_ID}" type="application/json">'
+                f"{inline_json(public_puzzle(puzzle))}</script>\n    "
+            )
+
+        if service_worker:
+            script_tag += f"\n    {SERVICE_WORKER_REGISTRATION}"
+
+        return html.replace("</body>", f"    {data_tag}{script_tag}\n</body>")
+
+    def _write_file(self, relative_path: str, data: bytes) -> str:
+        path = os.path.join(self.out_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return relative_path
+
+    def write_dated_puzzles(self, puzzle: Optional[Dict[str, Any]]) -> List[str]:
+        """
+        Publish the current and recently published puzzles as puzzles/<date>.json.
+
+        Only published records up to today are shipped: queued drafts are
+        unreviewed, and any file for a future date would give its answer away.
+        """
+        today = config.DEFAULT_DATE
+        published = {
+            record["date"]: record for record in puzzle_archive.load_published_puzzles(include_today=False)
+            if not record.get("track") and record["date"] <= today
+        }
+        dated = {date: published[date] for date in sorted(published)[-config.PRECACHE_PUZZLE_DAYS:]}
+        if puzzle is not None and puzzle.get("date") and puzzle["date"] <= today:
+            dated[puzzle["date"]] = puzzle
+
+        written = []
+        for date, data in sorted(dated.items()):
+            text = json.dumps(public_puzzle(data), separators=(",", ":"))
+            written.append(self._write_file(f"{PUZZLES_DIR}/{date}.json", text.encode("utf-8")))
+        return written
+
+    def precache_manifest(self, urls: List[str]) -> Dict[str, Any]:
+        """Versioned list of URLs for the service worker; the version changes with any content."""
+        digest = hashlib.sha256()
+        for url in urls:
+            digest.update(url.encode("utf-8"))
+            if url != "./":
+                with open(os.path.join(self.out_dir, url), "rb") as f:
+                    digest.update(content_hash(f.read()).encode("ascii"))
+        return {"version": digest.hexdigest()[:HASH_LENGTH], "urls": urls}
+
+    def write_service_worker(self, urls: List[str]) -> Dict[str, Any]:
+        manifest = self.precache_manifest(urls)
+        self._write_file("precache-manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+        template = self._read(SERVICE_WORKER_SOURCE)
+        worker = template.replace("__PRECACHE_MANIFEST__", json.dumps(manifest, separators=(",", ":")))
+        self._write_file(SERVICE_WORKER_NAME, minify_js(worker).encode("utf-8"))
+        return manifest
+
+    def build(self, puzzle_path: str = config.OUTPUT_FILE, inline_assets: bool = False,
+              service_worker: bool = True) -> Dict[str, Any]:
+        """Build the site and return a summary of what was written."""
+        if os.path.isdir(self.out_dir):
+            shutil.rmtree(self.out_dir)
+        os.makedirs(self.out_dir)
+
+        js = self.bundle_js()
+        css = self.bundle_css()
+        puzzle = self.load_puzzle(puzzle_path)
+
+        html = self.render_html(css, js, puzzle, inline_assets, service_worker)
+        with open(os.path.join(self.out_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+        # Keep today.json available for clients that still fetch it
+        if puzzle is not None:
+            with open(os.path.join(self.out_dir, "today.json"), "w", encoding="utf-8") as f:
+                json.dump(public_puzzle(puzzle), f, separators=(",", ":"))
+
+        with open(os.path.join(self.out_dir, "asset-manifest.json"), "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+        precache = None
+        if service_worker:
+            urls = ["./", "index.html"] + sorted(self.manifest.values())
+            if puzzle is not None:
+                urls.append("today.json")
+            urls += self.write_dated_puzzles(puzzle)
+            precache = self.write_service_worker(urls)
+
+        source_bytes = sum(os.path.getsize(os.path.join(self.root, p)) for p in JS_SOURCES + CSS_SOURCES)
+        return {
+            "out_dir": self.out_dir,
+            "manifest": dict(self.manifest),
+            "html_bytes": len(html.encode("utf-8")),
+            "js_bytes": len(js.encode("utf-8")),
+            "css_bytes": len(css.encode("utf-8")),
+            "source_bytes": source_bytes,
+            "puzzle_inlined": puzzle is not None,
+            "precache": precache
+        }
+
+
+def main():
+    """Command-line interface for building the static site."""
+    parser = argparse.ArgumentParser(description="Build the static site for deployment")
+    parser.add_argument('--out', default=config.BUILD_DIR, help='Output directory (default: dist)')
+    parser.add_argument('--puzzle', default=config.OUTPUT_FILE, help='Puzzle to inline (default: today.json)')
+    parser.add_argument('--inline-assets', action='store_true',
+                        help='Inline CSS and JS into index.html instead of hashed files')
+    parser.add_argument('--no-service-worker', action='store_true',
+                        help='Skip the offline service worker and precache manifest')
+
+    args = parser.parse_args()
+
+    print("🏗️  Building The Differential")
+    print("=" * 40)
+
+    summary = SiteBuilder(out_dir=args.out).build(args.puzzle, args.inline_assets, not args.no_service_worker)
+
+    for logical, hashed in summary["manifest"].items():
+        print(f"📦 {logical} → {hashed}")
+    print(f"📄 index.html: {summary['html_bytes']:,} bytes")
+    print(f"🗜️  Assets: {summary['source_bytes']:,} → {summary['js_bytes'] + summary['css_bytes']:,} bytes")
+    if summary["puzzle_inlined"]:
+        print("🧩 Puzzle inlined into index.html")
+    else:
+        print(f"⚠️  Puzzle file '{args.puzzle}' not found; game will fall back to fetching today.json")
+    if summary["precache"]:
+        precache = summary["precache"]
+        print(f"📴 Service worker {precache['version']}: {len(precache['urls'])} URLs precached")
+    print(f"✅ Site written to {summary['out_dir']}/")
+
+
+if __name__ == "__main__":
+    main()
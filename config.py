@@ -12,6 +12,13 @@ OPENAI_API_KEY_FILE = "openai_key.txt"  # Store your key in this file (will be g
 DEFAULT_DATE = datetime.now().strftime("%Y-%m-%d")
 OUTPUT_FILE = "today.json"
 BACKUP_DIR = "generated_puzzles"
+QUEUE_SUBDIR = "queue"          # Prefetched puzzles awaiting publication: BACKUP_DIR/queue/YYYY-MM-DD.json
+PUBLISHED_SUBDIR = "published"  # Record of every saved puzzle: BACKUP_DIR/published/YYYY-MM-DD[-track].json
+
+# Prefetch Worker Settings
+PREFETCH_DEPTH = 7              # Keep this many upcoming days (starting today) queued
+PREFETCH_CONCURRENCY = 2        # Simultaneous generations while refilling
+PREFETCH_INTERVAL_SECONDS = 600 # How often the worker re-checks the queue
 
 # Agent Configuration
 AVAILABLE_AGENTS = {
@@ -20,14 +27,15 @@ AVAILABLE_AGENTS = {
         "description": "Generates complete puzzles using OpenAI GPT models",
         "class": "OpenAIPuzzleAgent",
         "module": "agents.openai_puzzle_agent"
+    },
+    "topic": {
+        "name": "Topic Selection Agent",
+        "description": "Selects an unused answer from the topic catalog for the puzzle agent",
+        "class": "TopicAgent",
+        "module": "agents.topic_agent",
+        "role": "topic"  # Feeds the puzzle agent; cannot generate puzzles itself
     }
     # Future agents will be added here:
-    # "topic": {
-    #     "name": "Topic Selection Agent", 
-    #     "description": "Selects medical discipline and specific topic",
-    #     "class": "TopicAgent",
-    #     "module": "agents.topic_agent"
-    # },
     # "research": {
     #     "name": "Research Agent",
     #     "description": "Searches for recent medical guidelines",
@@ -36,10 +44,54 @@ AVAILABLE_AGENTS = {
     # }
 }
 
+# Topic Catalog Settings
+TOPIC_CATALOG_FILE = "topic_catalog.json"  # Candidate answers per discipline and category
+TOPIC_COOLDOWN_DAYS = 365                  # A published answer may be reused after this long (at most)
+TOPIC_COOLDOWN_CATALOG_SHARE = 0.8         # ...or after this share of the days a slot takes to use its whole catalog
+
+# Differential Graph Settings (differential_graph.py)
+DIFFERENTIAL_GRAPH_FILE = ".differential_graph.json"  # Answer/concept co-occurrence, refreshed on every backup
+GRAPH_PREFILL = True        # Prefill an assigned topic's differential from the graph
+GRAPH_PREFILL_MIN = 12      # ...only when the graph knows at least this many neighbours
+GRAPH_PREFILL_MAX = 18      # Concepts taken from the graph; the model supplies the rest
+
 # OpenAI Settings
 OPENAI_MODEL = "gpt-4"
 OPENAI_TEMPERATURE = 0.7
-OPENAI_MAX_TOKENS = 2000
+OPENAI_MAX_TOKENS = 2000            # Completion allowance until enough sizes have been observed
+
+# Adaptive Completion Limits (max_tokens from observed completion sizes per model and category)
+COMPLETION_STATS_FILE = ".completion_stats.json"
+COMPLETION_STATS_WINDOW = 200       # Most recent completions kept per model/category
+COMPLETION_MIN_SAMPLES = 10         # Use OPENAI_MAX_TOKENS until this many are recorded
+COMPLETION_PERCENTILE = 95          # Size the allowance for this percentile...
+COMPLETION_MARGIN = 0.15            # ...plus this fraction
+OPENAI_MAX_TOKENS_CEILING = 4000    # Never reserve more than this per request
+MAX_CONTINUATIONS = 2               # Follow-up requests after a finish_reason of "length"
+
+# Audience Tracks (fan-out: one answer, a tile set per track; generate_puzzle.py --tracks)
+AUDIENCE_TRACKS = {
+    "student": "medical student; classic textbook findings and first-line tests, explanations teach the basic mechanism",
+    "resident": "resident; typical presentations with workup details, explanations focus on clinical reasoning",
+    "attending": "attending; subtle, atypical or specialist findings, explanations cover nuances and pitfalls"
+}
+FANOUT_CORE_MAX_TOKENS = 600        # Shared answer, synonyms and differential
+FANOUT_TRACK_MAX_TOKENS = 1600      # One track's tiles and explanations
+
+# Tile Regeneration (review-time fixes of individual tiles)
+TILE_REGEN_BASE_TOKENS = 100        # Completion allowance for the JSON envelope
+TILE_REGEN_TOKENS_PER_TILE = 300    # Clue plus a 50-150 word explanation
+
+# Rate Limits (shared by every generator process on this machine)
+OPENAI_RPM_LIMIT = 500                  # Provider requests-per-minute limit for your tier
+OPENAI_TPM_LIMIT = 10000                # Provider tokens-per-minute limit for your tier
+RATE_LIMIT_TARGET_UTILIZATION = 0.9     # Stay just under the limits
+RATE_LIMIT_MAX_REQUEST_TOKENS = 6000    # Largest single request (prompt + OPENAI_MAX_TOKENS_CEILING)
+RATE_LIMIT_STATE_FILE = ".rate_limit_state.json"
+
+# Prompt Settings
+FOCUSED_PROMPT_FILE = "AI_FOCUSED_PROMPT.md"  # Stable text first, per-puzzle assignment last
+SYSTEM_PROMPT = "You are an expert medical educator creating diagnostic puzzles. Always respond with valid JSON only, no additional text."
 
 # Validation Settings
 REQUIRED_TILE_COUNTS = {
@@ -99,6 +151,10 @@ DISCIPLINE_WEIGHTS = {
     "Otolaryngology": 0.01        # ENT conditions with systemic features
 }
 
+# Base seed for the dated selection schedule (DisciplineSelector.select_for_date).
+# Changing it reshuffles every future day's discipline/category.
+SELECTION_SEED = 0
+
 # Discipline-specific category preferences
 # When a discipline is selected, these weights modify the category selection
 DISCIPLINE_CATEGORY_MODIFIERS = {
@@ -113,6 +169,40 @@ DISCIPLINE_CATEGORY_MODIFIERS = {
 PRETTY_PRINT_JSON = True
 CREATE_BACKUPS = True
 
+# Site Build Settings
+BUILD_DIR = "dist"
+INLINE_PUZZLE_ELEMENT_ID = "puzzle-data"  # <script> element holding the inlined puzzle
+PRECACHE_PUZZLE_DAYS = 7                  # Recent published puzzles (never future ones) the service worker caches
+
+# Production Cache-Control policy, first matching glob wins (paths relative to site root)
+CACHE_CONTROL_POLICY = [
+    ("assets/*", "public, max-age=31536000, immutable"),  # content-hashed, never changes
+    ("*.html", "no-cache"),                                # always revalidate the page
+    ("sw.js", "no-cache"),                                 # new deploys must reach the browser
+    ("today.json", "no-cache"),                            # changes daily
+    ("*.json", "public, max-age=300"),
+    ("*", "public, max-age=3600")
+]
+
+# Search Index Settings (search_index.py)
+SEARCH_INDEX_FILE = ".search_index.db"    # SQLite inverted index over the archive, updated incrementally
+SEARCH_INDEX_VERSION = 1                  # Bump when tokenization or layout changes to force a rebuild
+WARN_REUSED_CLUES = True                  # Log archived puzzles that already used a new puzzle's clues
+
+# Puzzle Pack Settings (puzzle_pack.py)
+PACK_FILE = "puzzles.pack"  # Binary export of the archive with a date index, for offline/mobile use
+
+# Benchmark Settings
+BENCHMARK_REGRESSION_THRESHOLD = 0.2  # Fail `benchmark_suite.py compare` on >20% slowdowns
+BENCHMARK_NOISE_FACTOR = 2.0          # ...plus this many times the runs' own round-to-round spread
+BENCHMARK_NOISE_FLOOR_SECONDS = 5e-6  # ...and by more than this per call (timer and scheduler jitter)
+
+
+def puzzle_agent_names():
+    """Agents that generate complete puzzles (valid --agent choices)."""
+    return [name for name, agent in AVAILABLE_AGENTS.items() if agent.get("role", "puzzle") == "puzzle"]
+
+
 def load_api_key():
     """Load OpenAI API key from file."""
     key_file = OPENAI_API_KEY_FILE
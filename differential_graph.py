@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Differential co-occurrence graph for The Differential.
+Answers and concepts that appear in the same archived puzzle are linked,
+weighted by how many puzzles they share (more when one of them was the
+answer). A new puzzle's differential can then be prefilled from the nearest
+neighbours of its answer, so the model only has to supply the gaps.
+
+The graph is kept in a JSON file, refreshed incrementally from the archive
+and updated whenever the generator writes a backup.
+
+Usage:
+    python differential_graph.py "Multiple Sclerosis"
+    python differential_graph.py "Sheehan's Syndrome" --discipline Endocrinology --limit 25
+    python differential_graph.py --stats
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import puzzle_archive
+from agents.topic_agent import normalize_answer
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance, as levenshteinDistance() in js/game.js."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(current[j - 1] + 1, previous[j] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def collides(concept: str, answers: List[str]) -> bool:
+    """
+    Whether picking `concept` in the game would be accepted as one of `answers`.
+
+    Mirrors checkAnswerMatch() in js/game.js: exact match after
+    normalization, isFuzzyMatch() (typo distance) and isPartialMatch()
+    (substring either way).
+    """
+    text = normalize_answer(concept)
+    threshold = min(3, int(len(text) * 0.15))
+    for answer in answers:
+        target = normalize_answer(answer)
+        if text == target:
+            return True
+        if len(text) >= 4 and (levenshtein(text, target) <= threshold or text in target or target in text):
+            return True
+    return False
+
+
+def merge_concepts(answer: str, acceptable_answers: List[str], prefilled: List[str],
+                   generated: List[str], limit: int = config.MAX_CONCEPTS) -> List[str]:
+    """
+    Final differential: the answer, then prefilled concepts, then the model's additions.
+
+    Duplicates (after normalization) and anything that would be accepted as
+    the answer are dropped; the list is capped at `limit`.
+    """
+    answers = [answer] + list(acceptable_answers or [])
+    concepts, seen = [answer], {normalize_answer(answer)}
+    for concept in list(prefilled) + list(generated):
+        if not isinstance(concept, str):
+            continue
+        key = normalize_answer(concept)
+        if not key or key in seen or collides(concept, answers):
+            continue
+        seen.add(key)
+        concepts.append(concept)
+        if len(concepts) >= limit:
+            break
+    return concepts
+
+
+class DifferentialGraph:
+    """Weighted answer/concept co-occurrence graph derived from the archive."""
+
+    def __init__(self, path: str = config.DIFFERENTIAL_GRAPH_FILE):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.labels: Dict[str, str] = {}
+        self._members: Optional[Dict[str, List[str]]] = None
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.files = data.get("files", {})
+        self.labels = data.get("labels", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "labels": self.labels}, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def add_file(self, path: str, puzzle: Dict[str, Any] = None):
+        """Record (or refresh) one archived puzzle's answer and differential."""
+        stat = os.stat(path)
+        if puzzle is None:
+            puzzle = puzzle_archive.load_puzzle_file(path)
+        names = [puzzle.get("answer", "")] + [c for c in puzzle.get("concepts", []) if isinstance(c, str)]
+        for name in names:
+            key = normalize_answer(name)
+            if key:
+                self.labels.setdefault(key, name)
+        self.files[path] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            # Drafts, retries and track variants of one puzzle count once
+            "puzzle": f"{puzzle.get('date', '')}|{normalize_answer(puzzle.get('answer', ''))}",
+            "discipline": puzzle.get("discipline", ""),
+            "answer": normalize_answer(puzzle.get("answer", "")),
+            "concepts": sorted({normalize_answer(c) for c in names[1:]} - {""})
+        }
+        self._members = None
+        self.dirty = True
+
+    def update(self, paths: Optional[List[str]] = None) -> Dict[str, int]:
+        """Bring the graph in line with the archive; returns counts of added/updated/removed files."""
+        paths = paths if paths is not None else puzzle_archive.archive_files()
+        counts = {"added": 0, "updated": 0, "removed": 0}
+
+        current = set(paths)
+        for path in [p for p in self.files if p not in current]:
+            del self.files[path]
+            counts["removed"] += 1
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            known = self.files.get(path)
+            if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size:
+                continue
+            try:
+                puzzle = puzzle_archive.load_puzzle_file(path)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if isinstance(puzzle, dict) and puzzle.get("concepts"):
+                self.add_file(path, puzzle)
+                counts["updated" if known else "added"] += 1
+
+        if counts["removed"]:
+            self._members = None
+            self.dirty = True
+        return counts
+
+    def _puzzles(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Node → distinct puzzles it appears in (as answer or concept)."""
+        if self._members is None:
+            puzzles = {}
+            for entry in self.files.values():
+                puzzles[entry["puzzle"]] = entry
+            members = defaultdict(list)
+            for entry in puzzles.values():
+                for node in set(entry["concepts"]) | {entry["answer"]}:
+                    members[node].append(entry)
+            self._members = members
+        return self._members
+
+    def neighbours(self, answer: str, discipline: str = None, limit: int = config.MAX_CONCEPTS,
+                   exclude: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Concepts most often seen alongside `answer`, strongest first.
+
+        Puzzles where `answer` was the answer count double, and puzzles from
+        the same discipline count half again. Anything that would be accepted
+        as the answer (or as one of `exclude`) is filtered out.
+        """
+        seed = normalize_answer(answer)
+        scores = defaultdict(float)
+        for entry in self._puzzles().get(seed, []):
+            weight = 2.0 if entry["answer"] == seed else 1.0
+            if discipline and entry["discipline"] == discipline:
+                weight *= 1.5
+            for node in set(entry["concepts"]) | {entry["answer"]}:
+                if node != seed:
+                    scores[node] += weight
+
+        answers = [answer] + list(exclude or [])
+        ranked = []
+        for node in sorted(scores, key=lambda n: (-scores[n], n)):
+            label = self.labels.get(node, node)
+            if collides(label, answers):
+                continue
+            ranked.append({"concept": label, "weight": scores[node]})
+            if len(ranked) >= limit:
+                break
+        return ranked
+
+    def stats(self) -> Dict[str, Any]:
+        members = self._puzzles()
+        return {
+            "files": len(self.files),
+            "puzzles": len({entry["puzzle"] for entry in self.files.values()}),
+            "nodes": len(members)
+        }
+
+
+def open_graph(path: str = config.DIFFERENTIAL_GRAPH_FILE) -> DifferentialGraph:
+    """Load the graph, bring it up to date with the archive and persist any changes."""
+    graph = DifferentialGraph(path)
+    graph.update()
+    graph.save()
+    return graph
+
+
+def main():
+    """Command-line interface for inspecting the differential graph."""
+    parser = argparse.ArgumentParser(description="Show the archived differential around an answer")
+    parser.add_argument('answer', nargs='?', help='Answer to find neighbouring concepts for')
+    parser.add_argument('--discipline', help='Favour puzzles from this discipline')
+    parser.add_argument('--limit', type=int, default=config.MAX_CONCEPTS, help=f'Maximum concepts (default: {config.MAX_CONCEPTS})')
+    parser.add_argument('--rebuild', action='store_true', help='Discard the graph and rebuild it from the archive')
+    parser.add_argument('--stats', action='store_true', help='Show graph statistics')
+
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(config.DIFFERENTIAL_GRAPH_FILE):
+        os.remove(config.DIFFERENTIAL_GRAPH_FILE)
+    graph = open_graph()
+
+    if args.stats or not args.answer:
+        print(json.dumps(graph.stats(), indent=2))
+        return
+
+    neighbours = graph.neighbours(args.answer, args.discipline, args.limit)
+    if not neighbours:
+        print(f"🕸️  No archived puzzles mention {args.answer!r}")
+        return
+    print(f"🕸️  {len(neighbours)} concept(s) seen alongside {args.answer!r}:")
+    for item in neighbours:
+        print(f"  {item['weight']:6.1f}  {item['concept']}")
+
+
+if __name__ == "__main__":
+    main()
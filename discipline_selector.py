@@ -6,23 +6,69 @@ This script handles all probabilistic choices BEFORE calling the AI model.
 
 import random
 import json
-from datetime import datetime
-from typing import Dict, Any, Tuple
+import hashlib
+from datetime import datetime, date as date_type, timedelta
+from typing import Dict, Any, Tuple, Optional, Union
 import config
 
 class DisciplineSelector:
     """Handles deterministic selection of medical discipline and puzzle category."""
     
-    def __init__(self, seed=None):
-        """Initialize selector with optional seed for reproducible results."""
-        if seed is not None:
-            random.seed(seed)
+    def __init__(self, seed=None, date: Union[str, date_type, None] = None, shard: int = 0):
+        """
+        Initialize selector with its own random generator.
+        
+        Without a seed or date the generator is seeded from OS entropy. With
+        either, it is derived from (seed, date, shard), so the same inputs give
+        the same choices in any process without touching the global `random`.
+        """
+        self.seed = seed
+        self.date = _date_key(date) if date is not None else None
+        self.shard = shard
+        if seed is None and date is None:
+            self.rng = random.Random()
+        else:
+            self.rng = self.make_rng(seed, date, shard)
         self.selection_history = []
     
-    def select_discipline_and_category(self, forced_discipline: str = None, forced_category: str = None) -> Dict[str, Any]:
+    @staticmethod
+    def derive_seed(seed, date: Union[str, date_type, None] = None, shard: int = 0) -> int:
+        """Derive a 64-bit generator seed from (base seed, date, shard)."""
+        if seed is None:
+            seed = config.SELECTION_SEED
+        key = f"{seed}|{_date_key(date) if date is not None else ''}|{shard}"
+        return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+    
+    @classmethod
+    def make_rng(cls, seed, date: Union[str, date_type, None] = None, shard: int = 0) -> random.Random:
+        """Create an independent generator for (base seed, date, shard)."""
+        return random.Random(cls.derive_seed(seed, date, shard))
+    
+    def select_for_date(self, date: Union[str, date_type], shard: int = 0,
+                        forced_discipline: str = None, forced_category: str = None) -> Dict[str, Any]:
+        """
+        Recompute the selection for one day of the schedule.
+        
+        Uses a fresh generator derived from (seed, date, shard), so any day can
+        be reproduced in O(1) on any worker and the result does not depend on
+        how many selections this instance has already made.
+        """
+        return self.select_discipline_and_category(
+            forced_discipline=forced_discipline,
+            forced_category=forced_category,
+            rng=self.make_rng(self.seed, date, shard),
+            date=_date_key(date),
+            shard=shard
+        )
+    
+    def select_discipline_and_category(self, forced_discipline: str = None, forced_category: str = None,
+                                       rng: Optional[random.Random] = None, date: Optional[str] = None,
+                                       shard: Optional[int] = None) -> Dict[str, Any]:
         """
         Select discipline and category using weighted probabilities.
         
+        Draws from `rng` when given, otherwise from this selector's generator.
+        
         Returns:
             Dict containing:
             - discipline: Selected medical discipline
@@ -31,6 +77,12 @@ class DisciplineSelector:
             - weights_used: The probability weights that led to this selection
         """
         
+        rng = rng or self.rng
+        if date is None:
+            date = self.date
+        if shard is None:
+            shard = self.shard
+        
         # Stage 1: Select discipline
         if forced_discipline:
             if forced_discipline not in config.DISCIPLINE_WEIGHTS:
@@ -39,7 +91,7 @@ class DisciplineSelector:
             selected_discipline = forced_discipline
             discipline_source = "forced"
         else:
-            selected_discipline = self._select_weighted_discipline()
+            selected_discipline = self._select_weighted_discipline(rng)
             discipline_source = "weighted_random"
         
         # Stage 2: Select category based on discipline
@@ -50,7 +102,7 @@ class DisciplineSelector:
             selected_category = forced_category
             category_source = "forced"
         else:
-            selected_category = self._select_weighted_category(selected_discipline)
+            selected_category = self._select_weighted_category(selected_discipline, rng)
             category_source = "weighted_random"
         
         # Generate selection rationale
@@ -62,6 +114,8 @@ class DisciplineSelector:
         # Track selection for history/analysis
         selection_record = {
             "timestamp": datetime.now().isoformat(),
+            "date": date,
+            "shard": shard,
             "discipline": selected_discipline,
             "category": selected_category,
             "discipline_source": discipline_source,
@@ -83,7 +137,7 @@ class DisciplineSelector:
             "selection_record": selection_record
         }
     
-    def _select_weighted_discipline(self) -> str:
+    def _select_weighted_discipline(self, rng: random.Random) -> str:
         """Select discipline using weighted random selection."""
         disciplines = list(config.DISCIPLINE_WEIGHTS.keys())
         weights = list(config.DISCIPLINE_WEIGHTS.values())
@@ -92,9 +146,9 @@ class DisciplineSelector:
         total_weight = sum(weights)
         normalized_weights = [w / total_weight for w in weights]
         
-        return random.choices(disciplines, weights=normalized_weights)[0]
+        return rng.choices(disciplines, weights=normalized_weights)[0]
     
-    def _select_weighted_category(self, discipline: str) -> str:
+    def _select_weighted_category(self, discipline: str, rng: random.Random) -> str:
         """Select category using weighted selection, modified by discipline preferences."""
         
         # Start with base category weights
@@ -115,7 +169,7 @@ class DisciplineSelector:
         categories = list(normalized_weights.keys())
         weights = list(normalized_weights.values())
         
-        return random.choices(categories, weights=weights)[0]
+        return rng.choices(categories, weights=weights)[0]
     
     def _get_category_weight(self, discipline: str, category: str) -> float:
         """Get the effective weight for a category given the discipline."""
@@ -208,6 +262,23 @@ class DisciplineSelector:
             }, f, indent=2)
 
 
+def slot_probability(discipline: str, category: str) -> float:
+    """Chance that a given day's puzzle falls in (discipline, category) under the configured weights."""
+    if discipline not in config.DISCIPLINE_WEIGHTS or category not in config.PUZZLE_CATEGORIES:
+        return 0.0
+    modifiers = config.DISCIPLINE_CATEGORY_MODIFIERS.get(discipline, {})
+    category_weights = {cat: info["weight"] * modifiers.get(cat, 1.0) for cat, info in config.PUZZLE_CATEGORIES.items()}
+    discipline_share = config.DISCIPLINE_WEIGHTS[discipline] / sum(config.DISCIPLINE_WEIGHTS.values())
+    return discipline_share * category_weights[category] / sum(category_weights.values())
+
+
+def _date_key(value: Union[str, date_type]) -> str:
+    """Normalize a date or YYYY-MM-DD string to the schedule's date key."""
+    if isinstance(value, date_type):
+        return value.strftime("%Y-%m-%d")
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
 def main():
     """Command-line interface for testing discipline selection."""
     import argparse
@@ -216,6 +287,8 @@ def main():
     parser.add_argument('--discipline', help='Force specific discipline')
     parser.add_argument('--category', help='Force specific category') 
     parser.add_argument('--seed', type=int, help='Random seed for reproducible results')
+    parser.add_argument('--date', help='Start date (YYYY-MM-DD); selections follow the dated schedule')
+    parser.add_argument('--shard', type=int, default=0, help='Shard number for dated selections')
     parser.add_argument('--count', type=int, default=1, help='Number of selections to make')
     parser.add_argument('--stats', action='store_true', help='Show statistics after selections')
     
@@ -233,10 +306,19 @@ def main():
             print(f"\n📋 Selection #{i+1}:")
         
         try:
-            result = selector.select_discipline_and_category(
-                forced_discipline=args.discipline,
-                forced_category=args.category
-            )
+            if args.date:
+                day = datetime.strptime(args.date, "%Y-%m-%d").date() + timedelta(days=i)
+                result = selector.select_for_date(
+                    day, shard=args.shard,
+                    forced_discipline=args.discipline,
+                    forced_category=args.category
+                )
+                print(f"📅 Date: {day.isoformat()} (shard {args.shard})")
+            else:
+                result = selector.select_discipline_and_category(
+                    forced_discipline=args.discipline,
+                    forced_category=args.category
+                )
             
             print(f"🏥 Discipline: {result['discipline']}")
             print(f"📊 Category: {result['category']}")
@@ -15,21 +15,28 @@ import sys
 import json
 import argparse
 import asyncio
+import logging
+from contextlib import contextmanager, suppress
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import config
+import puzzle_archive
+import search_index
+from differential_graph import DifferentialGraph, open_graph
 from agents.base_agent import AgentChain
 from agents.openai_puzzle_agent import OpenAIPuzzleAgent
+from agents.topic_agent import TopicAgent
 
 class PuzzleGenerator:
     """Main puzzle generation orchestrator."""
     
     def __init__(self):
         self.agents = {}
+        self.graph = None
         self.setup_logging()
         
     def setup_logging(self):
@@ -56,7 +63,10 @@ class PuzzleGenerator:
             api_key = config.load_api_key()
             if not api_key:
                 raise ValueError("OpenAI API key not found")
-            agent = OpenAIPuzzleAgent(api_key)
+            graph = self.load_graph() if config.GRAPH_PREFILL else None
+            agent = OpenAIPuzzleAgent(api_key, topic_agent=self.load_agent("topic"), differential_graph=graph)
+        elif agent_name == "topic":
+            agent = TopicAgent()
         else:
             # Future agents will be added here
             raise NotImplementedError(f"Agent {agent_name} not yet implemented")
@@ -64,8 +74,20 @@ class PuzzleGenerator:
         self.agents[agent_name] = agent
         return agent
     
-    async def generate_puzzle(self, agent_name: str = "openai_puzzle", forced_discipline: str = None, forced_category: str = None) -> Dict[str, Any]:
-        """Generate a puzzle using the specified agent."""
+    def load_graph(self) -> DifferentialGraph:
+        """Differential co-occurrence graph, refreshed from the archive on first use."""
+        if self.graph is None:
+            self.graph = open_graph()
+        return self.graph
+    
+    async def generate_puzzle(self, agent_name: str = "openai_puzzle", forced_discipline: str = None, forced_category: str = None,
+                              date: str = None, backup: bool = True) -> Dict[str, Any]:
+        """
+        Generate a puzzle using the specified agent (for a specific date if given).
+        
+        With backup=False the candidate is not archived; the caller backs it
+        up once it is actually shown for review or saved.
+        """
         self.logger.info(f"🧠 Loading agent: {config.AVAILABLE_AGENTS[agent_name]['name']}")
         
         agent = self.load_agent(agent_name)
@@ -75,6 +97,8 @@ class PuzzleGenerator:
             constraints.append(f"discipline: {forced_discipline}")
         if forced_category:
             constraints.append(f"category: {forced_category}")
+        if date:
+            constraints.append(f"date: {date}")
         
         if constraints:
             self.logger.info(f"🎯 Generating puzzle with constraints: {', '.join(constraints)}")
@@ -83,14 +107,91 @@ class PuzzleGenerator:
         
         puzzle = await agent.generate(
             forced_discipline=forced_discipline,
-            forced_category=forced_category
+            forced_category=forced_category,
+            date=date
         )
         
+        if backup:
+            self.archive_candidate(puzzle)
+        
+        return puzzle
+    
+    def archive_candidate(self, puzzle: Dict[str, Any]):
+        """Flag reused clues and back up a puzzle that is being reviewed or published."""
+        if config.WARN_REUSED_CLUES:
+            self.warn_reused_clues(puzzle)
+        
         # Create backup if enabled
         if config.CREATE_BACKUPS:
             self.create_backup(puzzle)
+    
+    async def regenerate_tiles(self, puzzle: Dict[str, Any], tile_indices, notes: str = None,
+                               agent_name: str = "openai_puzzle") -> Dict[str, Any]:
+        """Regenerate only the selected tiles of a puzzle under review."""
+        agent = self.load_agent(agent_name)
+        self.logger.info(f"🔧 Regenerating tiles {', '.join(str(i + 1) for i in tile_indices)}...")
         
-        return puzzle
+        updated = await agent.regenerate_tiles(puzzle, tile_indices, notes)
+        
+        if config.CREATE_BACKUPS:
+            self.create_backup(updated)
+        
+        return updated
+    
+    async def generate_track_set(self, agent_name: str, tracks: List[str], forced_discipline: str = None,
+                                 forced_category: str = None, date: str = None) -> Dict[str, Dict[str, Any]]:
+        """Generate linked puzzles for several audience tracks from one shared answer."""
+        agent = self.load_agent(agent_name)
+        self.logger.info(f"👥 Fanning out into tracks: {', '.join(tracks)}")
+        
+        puzzles = await agent.generate_tracks(tracks, forced_discipline, forced_category, date=date)
+        
+        if config.WARN_REUSED_CLUES:
+            for puzzle in puzzles.values():
+                self.warn_reused_clues(puzzle)
+        
+        if config.CREATE_BACKUPS:
+            for puzzle in puzzles.values():
+                self.create_backup(puzzle)
+        
+        return puzzles
+    
+    def track_filename(self, filename: str, track: str) -> str:
+        """Output file for one track: today.json → today-student.json."""
+        stem, ext = os.path.splitext(filename or config.OUTPUT_FILE)
+        return f"{stem}-{track}{ext}"
+    
+    def save_track_set(self, puzzles: Dict[str, Dict[str, Any]], filename: str = None) -> List[str]:
+        """Save each track's puzzle, linking every file to its siblings; returns the paths written."""
+        paths = {track: self.track_filename(filename, track) for track in puzzles}
+        links = {track: os.path.basename(path) for track, path in paths.items()}
+        written = []
+        for track, puzzle in puzzles.items():
+            puzzle["linked_puzzles"] = links
+            if not self.save_puzzle(puzzle, paths[track]):
+                break
+            written.append(paths[track])
+        return written
+    
+    def warn_reused_clues(self, puzzle: Dict[str, Any]) -> Dict[int, List[Dict[str, Any]]]:
+        """Log tiles whose clue already appears in a published puzzle; returns {tile index: hits}."""
+        index = search_index.open_index()
+        reused = {}
+        try:
+            for i, tile in enumerate(puzzle.get('tiles', [])):
+                hits, seen = [], set()
+                for hit in index.clue_matches(tile.get('clue', '')):
+                    if (hit['date'], hit['answer']) not in seen:
+                        seen.add((hit['date'], hit['answer']))
+                        hits.append(hit)
+                if hits:
+                    reused[i] = hits
+                    used_in = ", ".join(f"{hit['date']} ({hit['answer']})" for hit in hits[:3])
+                    more = f" and {len(hits) - 3} more" if len(hits) > 3 else ""
+                    self.logger.warning(f"♻️  Tile {i + 1} clue \"{tile['clue']}\" already used: {used_in}{more}")
+        finally:
+            index.close()
+        return reused
     
     def create_backup(self, puzzle: Dict[str, Any]):
         """Create a backup of the generated puzzle."""
@@ -99,6 +200,8 @@ class PuzzleGenerator:
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         answer = puzzle.get('answer', 'unknown').replace(' ', '_')
+        if puzzle.get('track'):
+            answer += f"_{puzzle['track']}"
         filename = f"{backup_dir}/puzzle_{timestamp}_{answer}.json"
         
         try:
@@ -107,6 +210,15 @@ class PuzzleGenerator:
             self.logger.info(f"📁 Backup saved: {filename}")
         except Exception as e:
             self.logger.error(f"Failed to create backup: {e}")
+            return
+        
+        # Keep the differential graph current with what was just archived
+        try:
+            graph = self.load_graph()
+            graph.add_file(filename, puzzle)
+            graph.save()
+        except Exception as e:
+            self.logger.warning(f"Could not update differential graph: {e}")
     
     def display_puzzle(self, puzzle: Dict[str, Any]):
         """Display the generated puzzle for review."""
@@ -117,6 +229,8 @@ class PuzzleGenerator:
         print(f"📅 Date: {puzzle.get('date', 'Unknown')}")
         print(f"🏥 Discipline: {puzzle.get('discipline', 'Unknown')}")
         print(f"🎯 Answer: {puzzle.get('answer', 'Unknown')}")
+        if puzzle.get('track'):
+            print(f"👥 Track: {puzzle['track']}")
         
         if 'topic_rationale' in puzzle:
             print(f"💡 Rationale: {puzzle['topic_rationale']}")
@@ -138,23 +252,47 @@ class PuzzleGenerator:
         
         print("\\n" + "="*60)
     
-    def review_puzzle(self, puzzle: Dict[str, Any]) -> bool:
-        """Allow user to review and approve the puzzle."""
+    def review_puzzle(self, puzzle: Dict[str, Any]):
+        """
+        Allow user to review and approve the puzzle.
+        
+        Returns True (approve), False (reject), None (regenerate everything) or
+        a dict {"tiles": [indices], "notes": str} to regenerate selected tiles.
+        """
         self.display_puzzle(puzzle)
         
         while True:
-            choice = input("\\n✅ Approve this puzzle? (y/n/r for regenerate): ").lower().strip()
+            choice = input("\\n✅ Approve this puzzle? (y/n/r for regenerate, t to fix tiles): ").lower().strip()
             if choice in ['y', 'yes']:
                 return True
             elif choice in ['n', 'no']:
                 return False
             elif choice in ['r', 'regenerate', 'regen']:
                 return None  # Signal to regenerate
+            elif choice in ['t', 'tiles', 'tile']:
+                tile_request = self._prompt_tile_selection(len(puzzle.get('tiles', [])))
+                if tile_request:
+                    return tile_request
             else:
-                print("Please enter 'y' for yes, 'n' for no, or 'r' to regenerate")
+                print("Please enter 'y' for yes, 'n' for no, 'r' to regenerate, or 't' to fix tiles")
+    
+    def _prompt_tile_selection(self, tile_count: int) -> Optional[Dict[str, Any]]:
+        """Ask which tiles (1-based, as displayed) to regenerate."""
+        raw = input(f"🔧 Tiles to regenerate (1-{tile_count}, e.g. '3 7'): ").replace(',', ' ').split()
+        try:
+            numbers = sorted({int(value) for value in raw})
+        except ValueError:
+            print("Please enter tile numbers only")
+            return None
+        if not numbers or any(n < 1 or n > tile_count for n in numbers):
+            print(f"Tile numbers must be between 1 and {tile_count}")
+            return None
+        
+        notes = input("📝 Notes for the model (optional): ").strip()
+        return {"tiles": [n - 1 for n in numbers], "notes": notes or None}
     
     def save_puzzle(self, puzzle: Dict[str, Any], filename: str = None) -> bool:
-        """Save the puzzle to the output file."""
+        """Save the puzzle to the output file and record it as published for its date."""
         if filename is None:
             filename = config.OUTPUT_FILE
         
@@ -165,6 +303,8 @@ class PuzzleGenerator:
                 else:
                     json.dump(puzzle, f)
             
+            # Topic cooldowns and the puzzle pack go by published puzzles, not drafts
+            puzzle_archive.record_published(puzzle)
             self.logger.info(f"💾 Puzzle saved to: {filename}")
             return True
         except Exception as e:
@@ -180,16 +320,17 @@ class PuzzleGenerator:
         # Create a short commit message without revealing the answer
         return f"Daily puzzle: {discipline} - {date}"
     
-    def show_git_commands(self, puzzle: Dict[str, Any]):
+    def show_git_commands(self, puzzle: Dict[str, Any], files: List[str] = None):
         """Display the git commands needed to deploy the puzzle."""
         commit_msg = self.generate_commit_message(puzzle)
+        files = files or ["today.json"]
         
         print("\n" + "="*60)
         print("🚀 READY TO DEPLOY")
         print("="*60)
         print("\nCopy and run these commands to publish your puzzle:")
         print("\n" + "-"*40)
-        print("git add today.json")
+        print(f"git add {' '.join(files)}")
         print(f'git commit -m "{commit_msg}"')
         print("git push origin main")
         print("-"*40)
@@ -203,7 +344,7 @@ async def main():
     parser.add_argument(
         '--agent', 
         default='openai_puzzle',
-        choices=list(config.AVAILABLE_AGENTS.keys()),
+        choices=config.puzzle_agent_names(),
         help='Agent to use for generation'
     )
     parser.add_argument(
@@ -230,8 +371,26 @@ async def main():
         choices=['diagnosis', 'lab_test', 'adverse_event'],
         help='Force a specific puzzle category'
     )
+    parser.add_argument(
+        '--date',
+        help='Puzzle date (YYYY-MM-DD); selection follows the dated plan (default: today)'
+    )
+    parser.add_argument(
+        '--tracks',
+        nargs='?',
+        const=','.join(config.AUDIENCE_TRACKS),
+        help='Fan out into linked audience tracks from one answer (default: all of '
+             f'{", ".join(config.AUDIENCE_TRACKS)}), saved as today-<track>.json'
+    )
+    parser.add_argument(
+        '--from-queue',
+        action='store_true',
+        help='Publish the prefetched puzzle for the date (see prefetch_worker.py), generating only if none is queued'
+    )
     
     args = parser.parse_args()
+    if args.tracks and args.from_queue:
+        parser.error("--tracks cannot be combined with --from-queue: the prefetch queue holds single puzzles")
     
     generator = PuzzleGenerator()
     
@@ -247,31 +406,82 @@ async def main():
             print("3. Run the script again")
             return
     
+    if args.tracks:
+        tracks = [track.strip() for track in args.tracks.split(',') if track.strip()]
+        await run_track_fanout(generator, args, tracks)
+        return
+    
+    puzzle_date = args.date
+    queued_puzzle = None
+    if args.from_queue:
+        puzzle_date = puzzle_date or config.DEFAULT_DATE
+        queued_puzzle = puzzle_archive.peek_queued(puzzle_date)
+        if queued_puzzle is None:
+            print(f"\n⚠️  No queued puzzle for {puzzle_date}; generating live")
+    
     attempts = 0
     max_attempts = args.max_attempts
+    category = getattr(args, 'category', None)
+    speculative = None  # Next candidate, generated in the background while the current one is reviewed
     
     while attempts < max_attempts:
-        attempts += 1
-        
         try:
-            print(f"\\n🎲 Generation attempt {attempts}/{max_attempts}")
-            puzzle = await generator.generate_puzzle(args.agent, args.discipline, getattr(args, 'category', None))
+            if queued_puzzle is not None:
+                # Prefetched and already validated: no API call needed
+                print(f"\n📦 Using queued puzzle for {puzzle_date}")
+                puzzle, queued_puzzle = queued_puzzle, None
+            elif speculative is not None:
+                attempts += 1
+                print(f"\n⚡ Generation attempt {attempts}/{max_attempts} (started during review)")
+                task, speculative = speculative, None
+                puzzle = await task
+            else:
+                attempts += 1
+                print(f"\\n🎲 Generation attempt {attempts}/{max_attempts}")
+                puzzle = await generator.generate_puzzle(args.agent, args.discipline, category,
+                                                         date=puzzle_date, backup=False)
+            
+            # Archived only now, so discarded speculative candidates never count as used
+            generator.archive_candidate(puzzle)
             
             if args.no_review:
                 # Auto-save without review
                 if generator.save_puzzle(puzzle, args.output):
+                    if puzzle_date:
+                        puzzle_archive.remove_queued(puzzle_date)
                     print("\\n🎉 Puzzle generated and saved successfully!")
                     return
                 else:
                     print("\\n❌ Failed to save puzzle")
                     return
             else:
-                # Manual review
-                review_result = generator.review_puzzle(puzzle)
+                # Speculatively start the next candidate so 'r' can swap it in immediately
+                if speculative is None and attempts < max_attempts:
+                    speculative = asyncio.create_task(
+                        generator.generate_puzzle(args.agent, args.discipline, category,
+                                                  date=puzzle_date, backup=False)
+                    )
+                
+                # Manual review; tile fixes loop back to review without using an attempt.
+                # input() runs in a thread so the speculative generation keeps going.
+                while True:
+                    with held_logs():
+                        review_result = await asyncio.to_thread(generator.review_puzzle, puzzle)
+                    if not isinstance(review_result, dict):
+                        break
+                    try:
+                        puzzle = await generator.regenerate_tiles(
+                            puzzle, review_result["tiles"], review_result["notes"], args.agent
+                        )
+                    except Exception as e:
+                        print(f"\n❌ Tile regeneration failed: {e}")
                 
                 if review_result is True:
                     # Approved
+                    await discard_speculative(speculative)
                     if generator.save_puzzle(puzzle, args.output):
+                        if puzzle_date:
+                            puzzle_archive.remove_queued(puzzle_date)
                         print("\\n🎉 Puzzle approved and saved!")
                         generator.show_git_commands(puzzle)
                         return
@@ -279,11 +489,14 @@ async def main():
                         print("\\n❌ Failed to save puzzle")
                         return
                 elif review_result is False:
-                    # Rejected
+                    # Rejected; free the queue slot so the prefetch worker refills it
+                    await discard_speculative(speculative)
+                    if args.from_queue:
+                        puzzle_archive.remove_queued(puzzle_date)
                     print("\\n❌ Puzzle rejected")
                     return
                 else:
-                    # Regenerate - continue loop
+                    # Regenerate - continue loop (uses the speculative candidate if one is running)
                     print("\\n🔄 Regenerating...")
                     continue
         
@@ -292,9 +505,96 @@ async def main():
             if attempts < max_attempts:
                 print("🔄 Retrying...")
             else:
+                await discard_speculative(speculative)
                 print("\\n💥 All attempts failed. Please check your setup and try again.")
                 return
 
+
+async def run_track_fanout(generator: PuzzleGenerator, args, tracks: List[str]):
+    """Generate, review and save one linked puzzle per audience track."""
+    for attempt in range(1, args.max_attempts + 1):
+        print(f"\n🎲 Fan-out attempt {attempt}/{args.max_attempts}: {', '.join(tracks)}")
+        try:
+            puzzles = await generator.generate_track_set(
+                args.agent, tracks, args.discipline, args.category, date=args.date
+            )
+        except Exception as e:
+            print(f"\n❌ Generation failed (attempt {attempt}): {e}")
+            continue
+        
+        verdict = True
+        if not args.no_review:
+            for track in tracks:
+                # Tile fixes loop back to review, as in the single-puzzle flow
+                while True:
+                    verdict = generator.review_puzzle(puzzles[track])
+                    if not isinstance(verdict, dict):
+                        break
+                    try:
+                        puzzles[track] = await generator.regenerate_tiles(
+                            puzzles[track], verdict["tiles"], verdict["notes"], args.agent
+                        )
+                    except Exception as e:
+                        print(f"\n❌ Tile regeneration failed: {e}")
+                if verdict is not True:
+                    break
+        
+        if verdict is False:
+            print("\n❌ Puzzle set rejected")
+            return
+        if verdict is None:
+            print("\n🔄 Regenerating all tracks...")
+            continue
+        
+        written = generator.save_track_set(puzzles, args.output)
+        if len(written) != len(tracks):
+            print("\n❌ Failed to save puzzle set")
+            return
+        print(f"\n🎉 Saved {len(written)} linked puzzles: {', '.join(written)}")
+        generator.show_git_commands(puzzles[tracks[0]], written)
+        return
+    
+    print("\n💥 All attempts failed. Please check your setup and try again.")
+
+
+async def discard_speculative(task: Optional[asyncio.Task]):
+    """Cancel a speculative generation that is no longer needed and wait for it to clean up."""
+    if task is None:
+        return
+    task.cancel()
+    # Lets its topic release run before the next attempt; also marks any failure as handled
+    with suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+@contextmanager
+def held_logs():
+    """Hold log output (e.g. from a speculative generation) while the reviewer is typing, then replay it."""
+    loggers = [logging.getLogger()] + [
+        logger for name, logger in logging.root.manager.loggerDict.items()
+        if name.startswith("differential") and isinstance(logger, logging.Logger)
+    ]
+    handlers = {handler for logger in loggers for handler in logger.handlers}
+    held, seen = [], set()
+
+    def hold(record):
+        # A record reaches both its agent's handler and the root handler; replay it once
+        if id(record) not in seen:
+            seen.add(id(record))
+            held.append(record)
+        return False
+
+    for handler in handlers:
+        handler.addFilter(hold)
+    try:
+        yield
+    finally:
+        for handler in handlers:
+            handler.removeFilter(hold)
+        for record in held:
+            logging.getLogger(record.name).handle(record)
+
+
 if __name__ == "__main__":
     # Run the async main function
     asyncio.run(main())
\ No newline at end of file
@@ -26,6 +26,31 @@ class DifferentialGame {
     }
 
     async loadGameData() {
+        // Built pages (build_site.py) inline the puzzle to save a round trip
+        const inlined = document.getElementById('puzzle-data');
+        if (inlined) {
+            try {
+                this.gameData = JSON.parse(inlined.textContent);
+                this.concepts = this.gameData.concepts;
+                console.log('Loaded inlined puzzle data');
+            } catch (error) {
+                console.error('Failed to parse inlined puzzle data:', error);
+            }
+        }
+        if (this.gameData) {
+            // A page from an earlier day (offline copy or an older deploy): the live puzzle may be newer
+            const today = this.localDateString();
+            if (this.gameData.date && this.gameData.date < today) {
+                const live = await this.loadLivePuzzle();
+                if (live && live.date > this.gameData.date) {
+                    this.gameData = live;
+                    this.concepts = live.concepts;
+                    console.log(`Loaded puzzle for ${live.date}`);
+                }
+            }
+            return;
+        }
+
         try {
             // Add cache-busting parameter to ensure fresh data
             const timestamp = new Date().getTime();
@@ -42,6 +67,24 @@ class DifferentialGame {
         }
     }
 
+    localDateString() {
+        const now = new Date();
+        const pad = value => String(value).padStart(2, '0');
+        return `${now.getFullYear()}-${pad(now.getMonth() + 1)}-${pad(now.getDate())}`;
+    }
+
+    async loadLivePuzzle() {
+        // today.json exists in every build (no 404s) and the service worker
+        // serves it network-first, falling back to its cached copy offline
+        try {
+            const response = await fetch(`today.json?v=${new Date().getTime()}`);
+            if (!response.ok) return null;
+            return await response.json();
+        } catch (error) {
+            return null;
+        }
+    }
+
     getFallbackData() {
         return {
             "date": "2025-07-24",
@@ -0,0 +1,91 @@
+// Service worker for The Differential.
+// build_site.py writes this file to the site root with the precache manifest
+// filled in; each deploy gets a new version, and old caches are dropped.
+const PRECACHE = __PRECACHE_MANIFEST__;
+const CACHE_PREFIX = 'differential-';
+const CACHE_NAME = `${CACHE_PREFIX}${PRECACHE.version}`;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.addAll(PRECACHE.urls))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith(CACHE_PREFIX) && key !== CACHE_NAME)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Content-hashed assets never change: serve from cache, fill on miss
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(CACHE_NAME);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// Pages and puzzle data change daily: go to the network so the day's first visit
+// gets the new puzzle, and fall back to the cache only when offline.
+// Query strings (today.json?v=...) are cache-busters, so entries ignore them.
+async function networkFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            const url = new URL(request.url);
+            cache.put(url.origin + url.pathname, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request, { ignoreSearch: true });
+        if (cached) return cached;
+        if (request.mode === 'navigate') {
+            const page = await cache.match('index.html');
+            if (page) return page;
+        }
+        throw error;
+    }
+}
+
+// Everything else (manifests, icons) is served from cache and refreshed in the background
+async function staleWhileRevalidate(event) {
+    const request = event.request;
+    const cache = await caches.open(CACHE_NAME);
+    const update = fetch(request).then(response => {
+        if (response.ok) cache.put(request, response.clone());
+        return response;
+    });
+    const cached = await cache.match(request);
+    if (cached) {
+        event.waitUntil(update.catch(() => undefined));
+        return cached;
+    }
+    return update;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+
+    if (url.pathname.includes('/assets/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (request.mode === 'navigate' || url.pathname.endsWith('/') ||
+               url.pathname.endsWith('.html') || url.pathname.endsWith('.json')) {
+        event.respondWith(networkFirst(request));
+    } else {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
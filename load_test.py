@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Synthetic player load test for The Differential.
+Replays realistic visits against a built site, served in-process by the
+preview server (or any running server via --url), and reports requests,
+bytes and latency per visit so payload and caching changes can be measured
+before deploy.
+
+Each simulated player behaves like a browser with an HTTP cache: it loads
+the page, its stylesheets and scripts, the puzzle (`today.json?v=<timestamp>`
+unless it is inlined), the `HEAD today.json` check from updateLastModified(),
+and, when the page registers one, installs and then uses the service worker.
+Repeat visits reuse the player's cache (ETag revalidation, max-age,
+immutable assets) on a virtual clock, so no real waiting is needed.
+
+Usage:
+    python build_site.py && python load_test.py
+    python load_test.py --players 500 --visits 5 --concurrency 50
+    python load_test.py --root . --no-service-worker     # development page
+    python load_test.py --url http://localhost:8000
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import threading
+import http.client
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from preview_server import create_server, brotli
+from agents.completion_stats import percentile
+
+ACCEPT_ENCODING = "gzip, br" if brotli is not None else "gzip"
+SUBRESOURCE_PATTERN = re.compile(r'<(?:link[^>]+rel="(?:stylesheet|preload)"[^>]+href|script[^>]+src)="([^"]+)"')
+INLINE_PUZZLE_PATTERN = re.compile(
+    r'<script id="' + re.escape(config.INLINE_PUZZLE_ELEMENT_ID) + r'" type="application/json">(.*?)</script>', re.S
+)
+SERVICE_WORKER_PATTERN = re.compile(r"serviceWorker\.register\('([^']+)'\)")
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def _decode(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return brotli.decompress(body)
+    return body
+
+
+class Player:
+    """One simulated visitor: a keep-alive connection plus a browser-like HTTP cache."""
+
+    def __init__(self, host: str, port: int, service_worker: bool = True):
+        self.host = host
+        self.port = port
+        self.service_worker = service_worker
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.cache: Dict[str, Dict[str, Any]] = {}   # path -> etag, fresh_until, body
+        self.worker_cache: Dict[str, bytes] = {}     # path -> body held by the service worker
+        self.worker_installed = False
+        self.clock = 0.0                             # virtual seconds, drives max-age expiry
+        self.requests: List[Dict[str, Any]] = []
+
+    def close(self):
+        self.connection.close()
+
+    def _send(self, method: str, path: str, headers: Dict[str, str]):
+        for attempt in range(2):
+            try:
+                started = time.perf_counter()
+                self.connection.request(method, path, headers=headers)
+                response = self.connection.getresponse()
+                body = response.read()
+                return response, body, time.perf_counter() - started
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.connection.close()
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                if attempt:
+                    raise
+
+    def request(self, path: str, method: str = "GET") -> Optional[bytes]:
+        """Fetch through the HTTP cache; returns the decoded body (None for HEAD or errors)."""
+        entry = self.cache.get(path) if method == "GET" else None
+        if entry and self.clock < entry["fresh_until"]:
+            return entry["body"]  # Fresh: served from cache without touching the network
+
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        response, body, elapsed = self._send(method, path, headers)
+        header_bytes = len(f"HTTP/1.1 {response.status} {response.reason}\r\n\r\n") + sum(
+            len(name) + len(value) + 4 for name, value in response.getheaders()
+        )
+        self.requests.append({
+            "method": method, "path": path, "status": response.status,
+            "bytes": len(body) + header_bytes, "latency": elapsed
+        })
+
+        fresh_until = self._fresh_until(response.getheader("Cache-Control", ""))
+        if response.status == 304 and entry:
+            entry["fresh_until"] = fresh_until
+            return entry["body"]
+        if method != "GET" or response.status != 200:
+            return None
+
+        decoded = _decode(body, response.getheader("Content-Encoding"))
+        if fresh_until is not None:
+            self.cache[path] = {"etag": response.getheader("ETag"), "fresh_until": fresh_until, "body": decoded}
+        return decoded
+
+    def _fresh_until(self, cache_control: str) -> Optional[float]:
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return float("-inf")  # Stored, but always revalidated
+        match = MAX_AGE_PATTERN.search(cache_control)
+        return self.clock + int(match.group(1)) if match else float("-inf")
+
+    def visit(self) -> Dict[str, Any]:
+        """One page load; returns the requests it made and how long it took."""
+        first = len(self.requests)
+        started = time.perf_counter()
+        worker_active = self.worker_installed
+
+        # The page is network-first, with or without the service worker
+        html = (self.request("/") or b"").decode("utf-8", "replace")
+
+        for url in SUBRESOURCE_PATTERN.findall(html):
+            path = "/" + url.lstrip("./")
+            if worker_active and "/assets/" in path and path in self.worker_cache:
+                continue  # Cache-first in the service worker
+            self.request(path)
+
+        inline = INLINE_PUZZLE_PATTERN.search(html)
+        stale = False
+        if inline is not None:
+            # A page from an earlier day checks the live puzzle
+            today = datetime.now().strftime("%Y-%m-%d")
+            stale = json.loads(inline.group(1)).get("date", today) < today
+        if inline is None or stale:
+            self.request(f"/today.json?v={int(time.time() * 1000)}")
+
+        self.request("/today.json", method="HEAD")
+
+        registration = SERVICE_WORKER_PATTERN.search(html) if self.service_worker else None
+        if registration:
+            # Browsers check the worker script for updates on every navigation
+            script = self.request("/" + registration.group(1))
+            if script and not self.worker_installed:
+                self._install_worker(script.decode("utf-8", "replace"))
+
+        return {
+            "first_visit": first == 0,
+            "requests": self.requests[first:],
+            "duration": time.perf_counter() - started
+        }
+
+    def _install_worker(self, script: str):
+        """Precache the manifest's URLs (through the HTTP cache, as cache.addAll does)."""
+        start = script.find("{", script.find("PRECACHE"))
+        try:
+            manifest, _ = json.JSONDecoder().raw_decode(script, start)
+        except ValueError:
+            return
+        for url in manifest.get("urls", []):
+            path = "/" + url.lstrip("./")
+            body = self.request(path)
+            if body is not None:
+                self.worker_cache[path] = body
+        self.worker_installed = True
+
+
+def run_load_test(host: str, port: int, players: int = 200, visits: int = 3, concurrency: int = 20,
+                  interval: float = 86400, service_worker: bool = True) -> Dict[str, Any]:
+    """Simulate players × visits with `concurrency` players active at once; returns a report."""
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def play(_):
+        player = Player(host, port, service_worker)
+        try:
+            for visit in range(visits):
+                player.clock = visit * interval
+                result = player.visit()
+                with lock:
+                    results.append(result)
+        finally:
+            player.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(play, range(players)))
+    elapsed = time.perf_counter() - started
+    return summarize(results, elapsed, players, visits, concurrency)
+
+
+def _route(request: Dict[str, Any]) -> str:
+    path = re.sub(r"\?v=\d+", "?v=<timestamp>", request["path"])
+    path = re.sub(r"/assets/([\w-]+)\.[0-9a-f]+\.", r"/assets/\1.<hash>.", path)
+    return f"{request['method']} {path}"
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float, players: int, visits: int,
+              concurrency: int) -> Dict[str, Any]:
+    """Requests, bytes and latency per visit, split into first and repeat visits."""
+    groups = {"first": [r for r in results if r["first_visit"]], "repeat": [r for r in results if not r["first_visit"]]}
+    requests = [request for result in results for request in result["requests"]]
+    report = {
+        "players": players, "visits_per_player": visits, "concurrency": concurrency,
+        "visits": len(results), "requests": len(requests), "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(requests) / elapsed, 1) if elapsed else None,
+        "status": dict(Counter(str(request["status"]) for request in requests))
+    }
+
+    for name, group in groups.items():
+        if not group:
+            continue
+        counts = [len(result["requests"]) for result in group]
+        sizes = [sum(request["bytes"] for request in result["requests"]) for result in group]
+        latencies = [request["latency"] * 1000 for result in group for request in result["requests"]]
+        durations = [result["duration"] * 1000 for result in group]
+        report[name] = {
+            "visits": len(group),
+            "requests_per_visit": round(sum(counts) / len(group), 2),
+            "bytes_per_visit": round(sum(sizes) / len(group)),
+            "request_ms": {"p50": round(percentile(latencies, 50), 2), "p99": round(percentile(latencies, 99), 2)}
+            if latencies else None,
+            "visit_ms": {"p50": round(percentile(durations, 50), 2), "p99": round(percentile(durations, 99), 2)}
+        }
+
+    routes = defaultdict(lambda: {"requests": 0, "bytes": 0, "status": Counter()})
+    for request in requests:
+        route = routes[_route(request)]
+        route["requests"] += 1
+        route["bytes"] += request["bytes"]
+        route["status"][str(request["status"])] += 1
+    report["routes"] = {
+        name: {"per_visit": round(route["requests"] / len(results), 2), "bytes": route["bytes"],
+               "status": dict(route["status"])}
+        for name, route in sorted(routes.items(), key=lambda item: -item[1]["requests"])
+    }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"👥 {report['players']} players × {report['visits_per_player']} visits, "
+          f"concurrency {report['concurrency']}: {report['visits']} visits, {report['requests']} requests "
+          f"in {report['seconds']}s ({report['requests_per_second']} req/s)")
+    for name, label in (("first", "First visit"), ("repeat", "Repeat visit")):
+        group = report.get(name)
+        if not group:
+            continue
+        latency = group["request_ms"]
+        latency_text = f"request p50 {latency['p50']} ms, p99 {latency['p99']} ms; " if latency else ""
+        print(f"\n📊 {label} ({group['visits']}): {group['requests_per_visit']} requests, "
+              f"{group['bytes_per_visit']:,} bytes per visit")
+        print(f"   {latency_text}visit p50 {group['visit_ms']['p50']} ms, p99 {group['visit_ms']['p99']} ms")
+    print("\n🛣️  Requests per visit by route:")
+    for name, route in report["routes"].items():
+        statuses = ", ".join(f"{count}×{status}" for status, count in sorted(route["status"].items()))
+        print(f"   {route['per_visit']:5.2f}  {name}  ({statuses}, {route['bytes']:,} bytes)")
+
+
+def main():
+    """Command-line interface for the load test."""
+    parser = argparse.ArgumentParser(description="Replay synthetic player visits against the built site")
+    parser.add_argument('--root', default=config.BUILD_DIR, help='Site to serve in-process (default: dist)')
+    parser.add_argument('--url', help='Test an already running server instead (e.g. http://localhost:8000)')
+    parser.add_argument('--players', type=int, default=200, help='Simulated players (default: 200)')
+    parser.add_argument('--visits', type=int, default=3, help='Visits per player (default: 3)')
+    parser.add_argument('--concurrency', type=int, default=20, help='Players active at once (default: 20)')
+    parser.add_argument('--interval', type=float, default=86400,
+                        help='Virtual seconds between a player\'s visits, for cache expiry (default: one day)')
+    parser.add_argument('--no-service-worker', action='store_true', help='Ignore service worker registration')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        if not os.path.isfile(os.path.join(args.root, "index.html")):
+            print(f"❌ No site in '{args.root}'. Run: python build_site.py")
+            sys.exit(1)
+        server = create_server(args.root, port=0, host="127.0.0.1", live_reload=False, quiet=True)
+        host, port = server.server_address[:2]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        report = run_load_test(host, port, args.players, args.visits, args.concurrency,
+                               args.interval, not args.no_service_worker)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
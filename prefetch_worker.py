@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Background prefetch worker for The Differential.
+Keeps a queue of validated puzzles for the upcoming days filled to a target
+depth, following the dated DisciplineSelector plan. The daily run then only
+has to dequeue, review and publish:
+
+    python prefetch_worker.py            # run continuously
+    python prefetch_worker.py --once     # fill the queue and exit (cron)
+    python generate_puzzle.py --from-queue
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import puzzle_archive
+from generate_puzzle import PuzzleGenerator
+
+
+class PrefetchWorker:
+    """Refills the puzzle queue asynchronously up to a target depth."""
+
+    def __init__(self, generator: PuzzleGenerator, agent_name: str = "openai_puzzle",
+                 depth: int = config.PREFETCH_DEPTH, concurrency: int = config.PREFETCH_CONCURRENCY,
+                 interval: float = config.PREFETCH_INTERVAL_SECONDS, max_attempts: int = 3):
+        self.generator = generator
+        self.agent_name = agent_name
+        self.depth = depth
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.logger = generator.logger
+
+    def target_dates(self, start: datetime = None) -> List[str]:
+        """The dates that should have a queued puzzle, starting today."""
+        start = start or datetime.now()
+        return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(self.depth)]
+
+    def published_date(self) -> str:
+        """Date of the puzzle currently live in the output file, if any."""
+        try:
+            return puzzle_archive.load_puzzle_file(config.OUTPUT_FILE).get("date", "")
+        except (OSError, ValueError):
+            return ""
+
+    def prune_stale(self, today: str):
+        """Drop queued puzzles for dates that have already passed."""
+        for date in puzzle_archive.queued_dates():
+            if date < today:
+                puzzle_archive.remove_queued(date)
+                self.logger.info(f"🗑️  Removed stale queued puzzle for {date}")
+
+    async def fill_date(self, date: str) -> bool:
+        """Generate, validate and enqueue the puzzle for one date."""
+        async with self.semaphore:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    # Backed up by generate_puzzle.py when it is published or reviewed
+                    puzzle = await self.generator.generate_puzzle(self.agent_name, date=date, backup=False)
+                except Exception as e:
+                    self.logger.error(f"❌ Prefetch for {date} failed (attempt {attempt}/{self.max_attempts}): {e}")
+                    continue
+                path = puzzle_archive.enqueue_puzzle(puzzle)
+                self.logger.info(f"📥 Queued {date}: {puzzle.get('discipline', 'Unknown')} → {path}")
+                return True
+            return False
+
+    async def refill(self) -> int:
+        """Fill every missing slot once; returns the number of puzzles queued."""
+        dates = self.target_dates()
+        self.prune_stale(dates[0])
+        queued = set(puzzle_archive.queued_dates())
+        published = self.published_date()
+        missing = [date for date in dates if date not in queued and date > published]
+        if not missing:
+            self.logger.info(f"✅ Queue full ({self.depth} days)")
+            return 0
+
+        self.logger.info(f"🔄 Refilling {len(missing)} slot(s): {', '.join(missing)}")
+        results = await asyncio.gather(*(self.fill_date(date) for date in missing))
+        return sum(results)
+
+    async def run_forever(self):
+        """Keep the queue topped up until interrupted."""
+        while True:
+            await self.refill()
+            await asyncio.sleep(self.interval)
+
+
+async def main():
+    """Command-line interface for the prefetch worker."""
+    parser = argparse.ArgumentParser(description="Keep a queue of upcoming puzzles generated and validated")
+    parser.add_argument('--agent', default='openai_puzzle', choices=config.puzzle_agent_names(),
+                        help='Agent to use for generation')
+    parser.add_argument('--depth', type=int, default=config.PREFETCH_DEPTH, help='Days to keep queued')
+    parser.add_argument('--concurrency', type=int, default=config.PREFETCH_CONCURRENCY,
+                        help='Simultaneous generations')
+    parser.add_argument('--interval', type=float, default=config.PREFETCH_INTERVAL_SECONDS,
+                        help='Seconds between queue checks')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Attempts per date per refill')
+    parser.add_argument('--once', action='store_true', help='Fill the queue once and exit')
+
+    args = parser.parse_args()
+
+    print("📦 The Differential - Prefetch Worker")
+    print("=" * 40)
+
+    if args.agent == 'openai_puzzle' and not config.load_api_key():
+        return
+
+    worker = PrefetchWorker(PuzzleGenerator(), args.agent, args.depth, args.concurrency,
+                            args.interval, args.max_attempts)
+    if args.once:
+        queued = await worker.refill()
+        print(f"\n📥 Queued {queued} puzzle(s); {len(puzzle_archive.queued_dates())} waiting")
+    else:
+        try:
+            await worker.run_forever()
+        except asyncio.CancelledError:
+            pass
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Prefetch worker stopped")
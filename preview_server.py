@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Local preview server for The Differential.
+A threaded replacement for `python -m http.server` that mirrors production
+caching: ETags with conditional requests, gzip/brotli compression, the
+per-path Cache-Control policy from config.py, and live reload of open tabs
+when today.json or site assets change on disk.
+
+Usage:
+    python preview_server.py [--port 8000] [--root .] [--no-reload]
+"""
+
+import os
+import gzip
+import time
+import fnmatch
+import hashlib
+import argparse
+import functools
+import mimetypes
+import threading
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import Dict, Optional, Tuple
+
+import config
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+LIVE_RELOAD_PATH = "/__livereload"
+
+LIVE_RELOAD_SNIPPET = b"""<script>
+(function() {
+    var source = new EventSource('""" + LIVE_RELOAD_PATH.encode() + b"""');
+    source.onmessage = function(event) {
+        if (event.data === 'reload') location.reload();
+    };
+})();
+</script>
+"""
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/javascript", "application/json", "image/svg+xml"
+)
+MIN_COMPRESS_BYTES = 256
+WATCHED_EXTENSIONS = (".html", ".js", ".css", ".json")
+IGNORED_DIRS = {".git", "__pycache__", config.BACKUP_DIR}
+
+
+def cache_control_for(path: str) -> str:
+    """Return the Cache-Control header production would send for a URL path."""
+    relative = path.lstrip("/")
+    if relative == "" or relative.endswith("/"):
+        relative += "index.html"  # Directory URLs are served (and cached) as their index page
+    for pattern, header in config.CACHE_CONTROL_POLICY:
+        if fnmatch.fnmatch(relative, pattern):
+            return header
+    return "no-cache"
+
+
+class FileWatcher(threading.Thread):
+    """Polls the site tree and wakes live-reload clients when files change."""
+
+    def __init__(self, root: str, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.root = root
+        self.interval = interval
+        self.generation = 0
+        self.changed = threading.Condition()
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, float]:
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # Dot-directories and dotfiles hold tool state (rate limiter, stats, graph), not site files
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS and not d.startswith(".")]
+            for filename in filenames:
+                if filename.endswith(WATCHED_EXTENSIONS) and not filename.startswith("."):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        snapshot[path] = os.stat(path).st_mtime
+                    except OSError:
+                        pass
+        return snapshot
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            snapshot = self._scan()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                with self.changed:
+                    self.generation += 1
+                    self.changed.notify_all()
+
+    def wait_for_change(self, generation: int, timeout: float) -> int:
+        """Block until the generation moves past `generation` or timeout."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.generation != generation, timeout=timeout)
+            return self.generation
+
+
+class PreviewRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler with production-style caching and compression."""
+
+    # Shared across handler instances: (path, mtime, size, encoding) -> (body, etag)
+    _cache: Dict[Tuple[str, float, int, str], Tuple[bytes, str]] = {}
+    _cache_lock = threading.Lock()
+    watcher: Optional[FileWatcher] = None
+    protocol_version = "HTTP/1.1"  # keep-alive, like production
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't stall on delayed ACKs
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] == LIVE_RELOAD_PATH:
+            self._serve_live_reload()
+        else:
+            self._serve_file(head_only=False)
+
+    def do_HEAD(self):
+        self._serve_file(head_only=True)
+
+    def _choose_encoding(self, content_type: str, size: int) -> str:
+        if size < MIN_COMPRESS_BYTES or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return "identity"
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in self.headers.get("Accept-Encoding", "").split(",")
+        }
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return "identity"
+
+    def _load(self, path: str, encoding: str) -> Tuple[bytes, str]:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime, stat.st_size, encoding)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached:
+            return cached
+
+        with open(path, "rb") as f:
+            body = f.read()
+        if self.watcher is not None and path.endswith(".html"):
+            body = body.replace(b"</body>", LIVE_RELOAD_SNIPPET + b"</body>", 1)
+
+        etag = hashlib.sha1(body).hexdigest()[:16]
+        if encoding == "gzip":
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            etag += "-gz"
+        elif encoding == "br":
+            body = brotli.compress(body)
+            etag += "-br"
+        result = (body, f'"{etag}"')
+
+        with self._cache_lock:
+            # Drop stale entries for this file before storing the new one
+            for stale in [k for k in self._cache if k[0] == path and k[1:3] != key[1:3]]:
+                del self._cache[stale]
+            self._cache[key] = result
+        return result
+
+    def _etag_matches(self, etag: str) -> bool:
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        candidates = [tag.strip() for tag in header.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    def _serve_file(self, head_only: bool):
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        path = self.translate_path(url_path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+            url_path = url_path.rstrip("/") + "/"
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        content_type = self.guess_type(path)
+        encoding = self._choose_encoding(content_type, os.path.getsize(path))
+        try:
+            body, etag = self._load(path, encoding)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        cache_control = cache_control_for(url_path)
+        if self._etag_matches(etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Last-Modified", self.date_time_string(int(os.path.getmtime(path))))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _serve_live_reload(self):
+        if self.watcher is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "Live reload disabled")
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        generation = self.watcher.generation
+        try:
+            while True:
+                current = self.watcher.wait_for_change(generation, timeout=15)
+                if current != generation:
+                    self.wfile.write(b"data: reload\n\n")
+                    generation = current
+                else:
+                    self.wfile.write(b": keep-alive\n\n")  # comment line keeps proxies happy
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        if self.path.split("?", 1)[0] != LIVE_RELOAD_PATH:
+            super().log_message(format, *args)
+
+
+def create_server(root: str = ".", port: int = 8000, host: str = "",
+                  live_reload: bool = True, quiet: bool = False) -> ThreadingHTTPServer:
+    """Create (but do not start) a preview server for `root`; `quiet` disables request logging."""
+    root = os.path.abspath(root)
+    attributes = {"_cache": {}, "watcher": None}
+    if quiet:
+        attributes["log_message"] = lambda self, format, *args: None
+    handler_class = type("BoundPreviewRequestHandler", (PreviewRequestHandler,), attributes)
+    if live_reload:
+        handler_class.watcher = FileWatcher(root)
+        handler_class.watcher.start()
+    handler = functools.partial(handler_class, directory=root)
+    server = ThreadingHTTPServer((host, port), handler, bind_and_activate=False)
+    server.daemon_threads = True
+    server.request_queue_size = 128  # the default backlog of 5 drops connection bursts
+    try:
+        server.server_bind()
+        server.server_activate()
+    except Exception:
+        server.server_close()
+        raise
+    return server
+
+
+def main():
+    """Command-line interface for the preview server."""
+    parser = argparse.ArgumentParser(description="Serve the site locally with production caching")
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--host', default='', help='Interface to bind (default: all)')
+    parser.add_argument('--root', default='.', help='Directory to serve (e.g. dist after build_site.py)')
+    parser.add_argument('--no-reload', action='store_true', help='Disable live reload')
+
+    args = parser.parse_args()
+
+    mimetypes.add_type("application/javascript", ".js")
+    server = create_server(args.root, args.port, args.host, live_reload=not args.no_reload)
+
+    print(f"🌐 Serving {os.path.abspath(args.root)} at http://localhost:{args.port}")
+    print(f"🗜️  Compression: gzip{' + brotli' if brotli else ''}")
+    if not args.no_reload:
+        print("🔄 Live reload enabled (today.json and assets are watched)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping preview server")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
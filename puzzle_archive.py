@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Access to archived puzzles for The Differential.
+Puzzles accumulate as JSON files in the backup directory (see
+PuzzleGenerator.create_backup); tools read them through this module.
+The backups include drafts that were never published; the puzzles that
+actually went live are recorded separately, one file per date.
+"""
+
+import os
+import json
+import glob
+import logging
+from typing import Dict, Any, List, Optional
+
+import config
+
+logger = logging.getLogger("differential.archive")
+
+
+def archive_files(directory: str = None) -> List[str]:
+    """List archived puzzle files, oldest first."""
+    directory = directory or config.BACKUP_DIR
+    return sorted(glob.glob(os.path.join(directory, "*.json")))
+
+
+def load_puzzle_file(path: str) -> Dict[str, Any]:
+    """Load a single puzzle JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_archived_puzzles(directory: str = None, include_today: bool = True) -> List[Dict[str, Any]]:
+    """
+    Load every readable puzzle in the archive.
+
+    Files that fail to parse or lack tiles are skipped with a warning. When
+    include_today is set, the live puzzle (config.OUTPUT_FILE) is included
+    unless an identical copy is already archived.
+    """
+    puzzles = []
+    paths = archive_files(directory)
+    if include_today and os.path.exists(config.OUTPUT_FILE):
+        paths.append(config.OUTPUT_FILE)
+
+    seen = set()
+    for path in paths:
+        try:
+            puzzle = load_puzzle_file(path)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping unreadable archive file {path}: {e}")
+            continue
+        if not isinstance(puzzle, dict) or not puzzle.get("tiles"):
+            continue
+
+        key = (puzzle.get("date"), puzzle.get("answer"))
+        if key in seen:
+            continue
+        seen.add(key)
+        puzzles.append(puzzle)
+    return puzzles
+
+
+# Prefetch queue: validated puzzles waiting to be published, one file per date
+
+def queue_dir(directory: str = None) -> str:
+    """Directory holding queued puzzles (inside the archive)."""
+    return os.path.join(directory or config.BACKUP_DIR, config.QUEUE_SUBDIR)
+
+
+def queued_path(date: str, directory: str = None) -> str:
+    """Path of the queued puzzle for a date."""
+    return os.path.join(queue_dir(directory), f"{date}.json")
+
+
+def queued_dates(directory: str = None) -> List[str]:
+    """Dates (YYYY-MM-DD) with a queued puzzle, in order."""
+    pattern = os.path.join(queue_dir(directory), "????-??-??.json")
+    return sorted(os.path.basename(path)[:-5] for path in glob.glob(pattern))
+
+
+def _write_atomic(path: str, puzzle: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(puzzle, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def enqueue_puzzle(puzzle: Dict[str, Any], directory: str = None) -> str:
+    """Atomically write a puzzle into the queue slot for its date."""
+    path = queued_path(puzzle["date"], directory)
+    _write_atomic(path, puzzle)
+    return path
+
+
+def peek_queued(date: str, directory: str = None) -> Optional[Dict[str, Any]]:
+    """Return the queued puzzle for a date without removing it."""
+    path = queued_path(date, directory)
+    try:
+        return load_puzzle_file(path)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        logger.warning(f"Ignoring corrupt queued puzzle {path}: {e}")
+        return None
+
+
+def remove_queued(date: str, directory: str = None) -> bool:
+    """Remove a date's slot from the queue (after publishing or rejection)."""
+    try:
+        os.remove(queued_path(date, directory))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# Published record: the puzzle that went live for each date (and track)
+
+def published_dir(directory: str = None) -> str:
+    """Directory holding published puzzles (inside the archive)."""
+    return os.path.join(directory or config.BACKUP_DIR, config.PUBLISHED_SUBDIR)
+
+
+def published_path(date: str, track: str = None, directory: str = None) -> str:
+    """Path of the published puzzle for a date (and audience track)."""
+    name = f"{date}-{track}" if track else date
+    return os.path.join(published_dir(directory), f"{name}.json")
+
+
+def published_files(directory: str = None) -> List[str]:
+    """Published puzzle files, in date order."""
+    return sorted(glob.glob(os.path.join(published_dir(directory), "????-??-??*.json")))
+
+
+def record_published(puzzle: Dict[str, Any], directory: str = None) -> Optional[str]:
+    """Record a saved puzzle as the published one for its date; replaces any earlier record."""
+    if not puzzle.get("date"):
+        return None
+    path = published_path(puzzle["date"], puzzle.get("track"), directory)
+    _write_atomic(path, puzzle)
+    return path
+
+
+def load_published_puzzles(directory: str = None, include_today: bool = True) -> List[Dict[str, Any]]:
+    """
+    Load the published puzzle for every date (and track), in date order.
+
+    When include_today is set, the live puzzle (config.OUTPUT_FILE) is the
+    one used for its date, even if the record was written by another run.
+    """
+    puzzles = {}
+    paths = published_files(directory)
+    if include_today and os.path.exists(config.OUTPUT_FILE):
+        paths.append(config.OUTPUT_FILE)
+
+    for path in paths:
+        try:
+            puzzle = load_puzzle_file(path)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping unreadable published puzzle {path}: {e}")
+            continue
+        if isinstance(puzzle, dict) and puzzle.get("date") and puzzle.get("tiles"):
+            puzzles[(puzzle["date"], puzzle.get("track") or "")] = puzzle
+    return [puzzles[key] for key in sorted(puzzles)]
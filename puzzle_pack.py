@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Binary puzzle packs for The Differential.
+Packs the published puzzles (or a date range of them) into one file for
+offline/mobile distribution and analytics: each day's puzzle is a compact tagged record,
+strings that repeat across puzzles (disciplines, concepts, keys...) are
+stored once in a string table, and a dense date index lets a reader
+memory-map the pack and decode any single day without touching the rest.
+
+Usage:
+    python puzzle_pack.py export                              # every published day → puzzles.pack
+    python puzzle_pack.py export --start 2025-01-01 --end 2025-06-30 --output h1.pack
+    python puzzle_pack.py export --include-drafts             # also days with only archived drafts
+    python puzzle_pack.py show 2025-03-14
+    python puzzle_pack.py verify                              # round-trip against the published puzzles
+
+Layout (little-endian):
+    header   magic, version, record count, first day ordinal, day count,
+             string table offset, index offset
+    records  one tagged value per puzzle
+    strings  count, count + 1 offsets, UTF-8 blob
+    index    day count × (record offset, record length); offset 0 = no puzzle
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from collections import Counter
+from datetime import date as Date
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import puzzle_archive
+
+MAGIC = b"DIFFPACK"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIIIQQ")  # magic, version, reserved, records, first ordinal, days, strings, index
+SLOT = struct.Struct("<QI")           # record offset, record length
+U32 = struct.Struct("<I")
+F64 = struct.Struct("<d")
+
+# Value tags
+T_NULL, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_REF, T_LIST, T_DICT = range(9)
+
+
+class PackError(ValueError):
+    """Raised for malformed pack files."""
+
+
+def _varint(value: int, out: bytearray):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos: int) -> Tuple[int, int]:
+    result, shift = 0, 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _strings(value, counts: Counter):
+    """Count every string (keys included) in a JSON value."""
+    if isinstance(value, str):
+        counts[value] += 1
+    elif isinstance(value, list):
+        for item in value:
+            _strings(item, counts)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            counts[key] += 1
+            _strings(item, counts)
+
+
+class _Encoder:
+    """Encodes JSON values, replacing interned strings with table references."""
+
+    def __init__(self, table: List[str]):
+        self.refs = {s: i for i, s in enumerate(table)}
+
+    def string(self, text: str, out: bytearray):
+        ref = self.refs.get(text)
+        if ref is not None:
+            out.append(T_REF)
+            _varint(ref, out)
+        else:
+            data = text.encode("utf-8")
+            out.append(T_STR)
+            _varint(len(data), out)
+            out += data
+
+    def value(self, value, out: bytearray):
+        if value is None:
+            out.append(T_NULL)
+        elif value is True:
+            out.append(T_TRUE)
+        elif value is False:
+            out.append(T_FALSE)
+        elif isinstance(value, int):
+            out.append(T_INT)
+            _varint(value * 2 if value >= 0 else -value * 2 - 1, out)  # zigzag
+        elif isinstance(value, float):
+            out.append(T_FLOAT)
+            out += F64.pack(value)
+        elif isinstance(value, str):
+            self.string(value, out)
+        elif isinstance(value, list):
+            out.append(T_LIST)
+            _varint(len(value), out)
+            for item in value:
+                self.value(item, out)
+        elif isinstance(value, dict):
+            out.append(T_DICT)
+            _varint(len(value), out)
+            for key, item in value.items():
+                self.string(key, out)
+                self.value(item, out)
+        else:
+            raise TypeError(f"Cannot pack {type(value).__name__}")
+
+
+def published_puzzles() -> Dict[str, Dict[str, Any]]:
+    """The published puzzle for each date (the live one for its date); audience tracks skipped."""
+    return {
+        puzzle["date"]: puzzle for puzzle in puzzle_archive.load_published_puzzles()
+        if not puzzle.get("track")
+    }
+
+
+def daily_puzzles(start: str = None, end: str = None, include_drafts: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    One puzzle per date within [start, end]: the one that was published.
+
+    The backups also hold rejected and speculative drafts, so they are only
+    used with include_drafts, for dates that have no published record (e.g.
+    archives older than the record); the newest draft wins there.
+    """
+    puzzles = {}
+    if include_drafts:
+        for puzzle in puzzle_archive.load_archived_puzzles(include_today=False):
+            if puzzle.get("date") and not puzzle.get("track"):
+                puzzles[puzzle["date"]] = puzzle
+    puzzles.update(published_puzzles())
+    return {
+        day: puzzle for day, puzzle in sorted(puzzles.items())
+        if not ((start and day < start) or (end and day > end))
+    }
+
+
+def write_pack(puzzles: Dict[str, Dict[str, Any]], path: str) -> Dict[str, int]:
+    """Write puzzles keyed by YYYY-MM-DD date to a pack file; returns size statistics."""
+    if not puzzles:
+        raise ValueError("No puzzles to pack")
+    ordinals = {day: Date.fromisoformat(day).toordinal() for day in puzzles}
+    first = min(ordinals.values())
+    days = max(ordinals.values()) - first + 1
+
+    counts = Counter()
+    for puzzle in puzzles.values():
+        _strings(puzzle, counts)
+    table = sorted((s for s, n in counts.items() if n > 1), key=lambda s: (-counts[s], s))
+    encoder = _Encoder(table)
+
+    records = bytearray()
+    slots = [(0, 0)] * days
+    for day, puzzle in puzzles.items():
+        offset = HEADER.size + len(records)
+        encoder.value(puzzle, records)
+        slots[ordinals[day] - first] = (offset, HEADER.size + len(records) - offset)
+
+    strings = bytearray(U32.pack(len(table)))
+    blob = bytearray()
+    for text in table:
+        strings += U32.pack(len(blob))
+        blob += text.encode("utf-8")
+    strings += U32.pack(len(blob)) + blob
+
+    strings_offset = HEADER.size + len(records)
+    index_offset = strings_offset + len(strings)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(puzzles), first, days, strings_offset, index_offset))
+        f.write(records)
+        f.write(strings)
+        f.write(b"".join(SLOT.pack(*slot) for slot in slots))
+    os.replace(temp_path, path)
+    return {"puzzles": len(puzzles), "interned": len(table), "records": len(records),
+            "strings": len(strings), "index": days * SLOT.size, "bytes": os.path.getsize(path)}
+
+
+class PuzzlePack:
+    """Memory-mapped pack reader; decodes a single day on demand."""
+
+    def __init__(self, path: str = config.PACK_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise PackError(f"{path}: too short to be a puzzle pack")
+        (magic, version, _, self.count, self.first_ordinal, self.days,
+         self._strings_offset, self._index_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise PackError(f"{path}: not a puzzle pack")
+        if version != VERSION:
+            raise PackError(f"{path}: unsupported pack version {version}")
+        self._string_count = U32.unpack_from(self._map, self._strings_offset)[0]
+        self._blob_offset = self._strings_offset + U32.size * (self._string_count + 2)
+        self._cache: Dict[int, str] = {}
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, day: str) -> bool:
+        return self._slot(day)[0] != 0
+
+    def _slot(self, day: str) -> Tuple[int, int]:
+        try:
+            index = Date.fromisoformat(day).toordinal() - self.first_ordinal
+        except (TypeError, ValueError):
+            raise PackError(f"invalid date {day!r}, expected YYYY-MM-DD") from None
+        if not 0 <= index < self.days:
+            return 0, 0
+        return SLOT.unpack_from(self._map, self._index_offset + index * SLOT.size)
+
+    def _string(self, ref: int) -> str:
+        text = self._cache.get(ref)
+        if text is None:
+            start, end = struct.unpack_from("<II", self._map, self._strings_offset + U32.size * (ref + 1))
+            text = str(self._map[self._blob_offset + start:self._blob_offset + end], "utf-8")
+            self._cache[ref] = text
+        return text
+
+    def _decode(self, buf, pos: int) -> Tuple[Any, int]:
+        tag = buf[pos]
+        pos += 1
+        if tag == T_REF:
+            ref, pos = _read_varint(buf, pos)
+            return self._string(ref), pos
+        if tag == T_STR:
+            length, pos = _read_varint(buf, pos)
+            return str(buf[pos:pos + length], "utf-8"), pos + length
+        if tag == T_DICT:
+            length, pos = _read_varint(buf, pos)
+            result = {}
+            for _ in range(length):
+                key, pos = self._decode(buf, pos)
+                result[key], pos = self._decode(buf, pos)
+            return result, pos
+        if tag == T_LIST:
+            length, pos = _read_varint(buf, pos)
+            result = []
+            for _ in range(length):
+                item, pos = self._decode(buf, pos)
+                result.append(item)
+            return result, pos
+        if tag == T_INT:
+            value, pos = _read_varint(buf, pos)
+            return (value >> 1) ^ -(value & 1), pos
+        if tag == T_FLOAT:
+            return F64.unpack_from(buf, pos)[0], pos + F64.size
+        if tag in (T_NULL, T_FALSE, T_TRUE):
+            return (None, False, True)[tag], pos
+        raise PackError(f"{self.path}: bad tag {tag} at {pos - 1}")
+
+    def get(self, day: str) -> Optional[Dict[str, Any]]:
+        """Decode the puzzle for a date (YYYY-MM-DD), or None if the pack has none."""
+        offset, length = self._slot(day)
+        if not offset:
+            return None
+        puzzle, end = self._decode(self._map, offset)
+        if end != offset + length:
+            raise PackError(f"{self.path}: record for {day} is corrupt")
+        return puzzle
+
+    def dates(self) -> List[str]:
+        """Dates with a puzzle, in order."""
+        return [
+            Date.fromordinal(self.first_ordinal + i).isoformat()
+            for i in range(self.days)
+            if SLOT.unpack_from(self._map, self._index_offset + i * SLOT.size)[0]
+        ]
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for day in self.dates():
+            yield day, self.get(day)
+
+
+def verify_pack(path: str, puzzles: Dict[str, Dict[str, Any]],
+                published: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """
+    Decode every day in the pack and compare with the source puzzles; returns problems found.
+
+    With `published`, each of those dates present in the pack must also
+    carry the published answer, whatever the source selection was.
+    """
+    problems = []
+    with PuzzlePack(path) as pack:
+        if set(pack.dates()) != set(puzzles):
+            missing = sorted(set(puzzles) - set(pack.dates()))
+            extra = sorted(set(pack.dates()) - set(puzzles))
+            problems.append(f"date mismatch: missing {missing[:5]}, unexpected {extra[:5]}")
+        for day, puzzle in puzzles.items():
+            if day in pack and pack.get(day) != puzzle:
+                problems.append(f"{day}: decoded puzzle differs from the archive")
+        for day, puzzle in (published or {}).items():
+            if day in pack and pack.get(day).get("answer") != puzzle.get("answer"):
+                problems.append(f"{day}: pack has {pack.get(day).get('answer')!r}, "
+                                f"published answer is {puzzle.get('answer')!r}")
+    return problems
+
+
+def main():
+    """Command-line interface for puzzle packs."""
+    parser = argparse.ArgumentParser(description="Export, inspect and verify binary puzzle packs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("export", "Pack published puzzles into one file"),
+                            ("verify", "Round-trip check of a pack against the published puzzles")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--start', help='First date to include (YYYY-MM-DD)')
+        sub.add_argument('--end', help='Last date to include (YYYY-MM-DD)')
+        sub.add_argument('--include-drafts', action='store_true',
+                         help='Fill dates with no published puzzle from archived drafts')
+        sub.add_argument('--pack', '--output', dest='pack', default=config.PACK_FILE,
+                         help=f'Pack file (default: {config.PACK_FILE})')
+
+    show_parser = subparsers.add_parser("show", help="Print one day's puzzle from a pack")
+    show_parser.add_argument('date', help='Date (YYYY-MM-DD)')
+    show_parser.add_argument('--pack', default=config.PACK_FILE, help=f'Pack file (default: {config.PACK_FILE})')
+
+    list_parser = subparsers.add_parser("list", help="List the dates in a pack")
+    list_parser.add_argument('--pack', default=config.PACK_FILE, help=f'Pack file (default: {config.PACK_FILE})')
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        puzzles = daily_puzzles(args.start, args.end, args.include_drafts)
+        if not puzzles:
+            print("❌ No published puzzles in that range")
+            sys.exit(1)
+        stats = write_pack(puzzles, args.pack)
+        json_bytes = sum(len(json.dumps(p, separators=(",", ":")).encode("utf-8")) for p in puzzles.values())
+        print(f"📦 Packed {stats['puzzles']} puzzles ({min(puzzles)} → {max(puzzles)}) into {args.pack}")
+        print(f"   {stats['bytes']:,} bytes (minified JSON: {json_bytes:,}); "
+              f"{stats['interned']} interned strings, {stats['index']:,}-byte date index")
+
+    elif args.command == "verify":
+        puzzles = daily_puzzles(args.start, args.end, args.include_drafts)
+        problems = verify_pack(args.pack, puzzles, published_puzzles())
+        if problems:
+            print(f"❌ {len(problems)} problem(s) in {args.pack}:")
+            for problem in problems[:20]:
+                print(f"   {problem}")
+            sys.exit(1)
+        print(f"✅ {args.pack}: all {len(puzzles)} puzzles round-trip exactly")
+
+    elif args.command == "show":
+        try:
+            with PuzzlePack(args.pack) as pack:
+                puzzle = pack.get(args.date)
+        except PackError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        if puzzle is None:
+            print(f"❌ No puzzle for {args.date} in {args.pack}")
+            sys.exit(1)
+        print(json.dumps(puzzle, indent=2, ensure_ascii=False))
+
+    elif args.command == "list":
+        with PuzzlePack(args.pack) as pack:
+            for day in pack.dates():
+                print(day)
+
+
+if __name__ == "__main__":
+    main()
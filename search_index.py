@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Full-text search over published puzzles for The Differential.
+An inverted index over tile clues, explanations, concepts and topic
+rationales, tokenized with the game's answer normalization. Only published
+records are indexed (generated_puzzles/published/), never rejected or
+speculative drafts. The index lives in a SQLite file so queries read only
+the postings they need, and it is updated incrementally: only records
+added, changed or removed since the last run are (re)indexed.
+
+Usage:
+    python search_index.py "lhermitte's sign"
+    python search_index.py oligoclonal bands --field explanation
+    python search_index.py --phrase "band keratopathy"
+    python search_index.py --stats
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import sqlite3
+import argparse
+from collections import defaultdict
+from typing import Dict, Any, List, Tuple, Optional
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import puzzle_archive
+from agents.topic_agent import normalize_answer
+
+FIELDS = ["clue", "explanation", "concept", "rationale"]
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+COMMON_TERM_FRACTION = 0.05  # Terms in more documents than this only rescore, never add candidates
+
+_QUOTED = re.compile(r'"([^"]+)"')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY, path TEXT, field TEXT, key TEXT,
+    date TEXT, answer TEXT, text TEXT, length INTEGER
+);
+CREATE INDEX IF NOT EXISTS docs_path ON docs (path);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT, doc INTEGER, positions TEXT, PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into terms exactly as the game normalizes answers."""
+    return normalize_answer(text).split()
+
+
+def puzzle_documents(puzzle: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """(field, key, text) for every searchable piece of a puzzle."""
+    documents = []
+    for i, tile in enumerate(puzzle.get("tiles", [])):
+        if isinstance(tile, dict) and tile.get("clue"):
+            documents.append(("clue", f"tile_{i}", tile["clue"]))
+    explanations = puzzle.get("explanations", {})
+    if isinstance(explanations, dict):
+        for key, text in sorted(explanations.items()):
+            if isinstance(text, str):
+                documents.append(("explanation", key, text))
+    for i, concept in enumerate(puzzle.get("concepts", [])):
+        if isinstance(concept, str):
+            documents.append(("concept", str(i), concept))
+    if puzzle.get("topic_rationale"):
+        documents.append(("rationale", "", puzzle["topic_rationale"]))
+    return documents
+
+
+class SearchIndex:
+    """Incrementally maintained inverted index with BM25 ranking and phrase queries."""
+
+    def __init__(self, path: str = None):
+        self.path = path or config.SEARCH_INDEX_FILE
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(_SCHEMA)
+        if self._meta("version") != str(config.SEARCH_INDEX_VERSION):
+            self._reset()  # Tokenization or layout changed: rebuild from scratch
+
+    def close(self):
+        self.db.close()
+
+    def _meta(self, key: str, default: str = None) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _reset(self):
+        with self.db:
+            for table in ("files", "docs", "postings", "meta"):
+                self.db.execute(f"DELETE FROM {table}")
+            self._set_meta("version", config.SEARCH_INDEX_VERSION)
+            self._set_meta("doc_count", 0)
+            self._set_meta("total_length", 0)
+
+    def _remove_file(self, path: str) -> Tuple[int, int]:
+        """Drop a file's documents; returns (documents removed, terms removed)."""
+        docs = self.db.execute("SELECT id, text, length FROM docs WHERE path = ?", (path,)).fetchall()
+        for doc_id, text, _ in docs:
+            self.db.executemany("DELETE FROM postings WHERE term = ? AND doc = ?",
+                                [(term, doc_id) for term in set(tokenize(text))])
+        self.db.execute("DELETE FROM docs WHERE path = ?", (path,))
+        self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+        return len(docs), sum(length for _, _, length in docs)
+
+    def _add_file(self, path: str, stat: os.stat_result, puzzle: Dict[str, Any]) -> Tuple[int, int]:
+        """Index a puzzle's documents; returns (documents added, terms added)."""
+        added, total = 0, 0
+        for field, key, text in puzzle_documents(puzzle):
+            terms = tokenize(text)
+            if not terms:
+                continue
+            cursor = self.db.execute(
+                "INSERT INTO docs (path, field, key, date, answer, text, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, field, key, puzzle.get("date", ""), puzzle.get("answer", ""), text, len(terms))
+            )
+            positions = defaultdict(list)
+            for position, term in enumerate(terms):
+                positions[term].append(str(position))
+            self.db.executemany("INSERT INTO postings (term, doc, positions) VALUES (?, ?, ?)",
+                                [(term, cursor.lastrowid, " ".join(p)) for term, p in positions.items()])
+            added += 1
+            total += len(terms)
+        self.db.execute("INSERT OR REPLACE INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                        (path, stat.st_mtime, stat.st_size))
+        return added, total
+
+    def update(self, paths: Optional[List[str]] = None) -> Dict[str, int]:
+        """Bring the index in line with the published records; returns counts of added/updated/removed files."""
+        paths = paths if paths is not None else puzzle_archive.published_files()
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        known = {path: (mtime, size) for path, mtime, size in self.db.execute("SELECT path, mtime, size FROM files")}
+        doc_count = int(self._meta("doc_count", 0))
+        total_length = int(self._meta("total_length", 0))
+
+        with self.db:
+            current = set(paths)
+            for path in [p for p in known if p not in current]:
+                docs, length = self._remove_file(path)
+                doc_count, total_length = doc_count - docs, total_length - length
+                counts["removed"] += 1
+
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if known.get(path) == (stat.st_mtime, stat.st_size):
+                    continue
+                try:
+                    puzzle = puzzle_archive.load_puzzle_file(path)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                if path in known:
+                    docs, length = self._remove_file(path)
+                    doc_count, total_length = doc_count - docs, total_length - length
+                    counts["updated"] += 1
+                else:
+                    counts["added"] += 1
+                if isinstance(puzzle, dict):
+                    docs, length = self._add_file(path, stat, puzzle)
+                    doc_count, total_length = doc_count + docs, total_length + length
+
+            self._set_meta("doc_count", doc_count)
+            self._set_meta("total_length", total_length)
+        return counts
+
+    def _document_frequency(self, term: str) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+
+    def _postings(self, term: str, fields: Optional[List[str]],
+                  docs: Optional[List[int]] = None) -> Dict[int, Tuple[str, int]]:
+        """doc id → (positions, document length) for one term, optionally restricted to fields or docs."""
+        sql = ("SELECT p.doc, p.positions, d.length FROM postings p JOIN docs d ON d.id = p.doc "
+               "WHERE p.term = ?")
+        params = [term]
+        if fields:
+            sql += f" AND d.field IN ({', '.join('?' * len(fields))})"
+            params += fields
+        if docs is None:
+            return {doc: (positions, length) for doc, positions, length in self.db.execute(sql, params)}
+
+        entries = {}
+        for i in range(0, len(docs), 500):
+            chunk = docs[i:i + 500]
+            query = sql + f" AND p.doc IN ({', '.join('?' * len(chunk))})"
+            entries.update((doc, (positions, length))
+                           for doc, positions, length in self.db.execute(query, params + chunk))
+        return entries
+
+    @staticmethod
+    def _has_phrase(postings: List[Dict[int, Tuple[str, int]]], doc: int) -> bool:
+        """Whether the phrase's terms occur consecutively in a document."""
+        starts = {int(p) for p in postings[0][doc][0].split()}
+        for offset, entries in enumerate(postings[1:], start=1):
+            starts &= {int(p) - offset for p in entries[doc][0].split()}
+            if not starts:
+                return False
+        return True
+
+    def search(self, query: str, fields: Optional[List[str]] = None, limit: int = 10,
+               phrase: bool = False) -> List[Dict[str, Any]]:
+        """
+        Rank documents for a query with BM25.
+
+        Quoted parts of the query (or the whole query with phrase=True) must
+        appear as consecutive terms; other terms are optional and add score.
+        Rarest terms are read first and pick the candidates; postings of very
+        common terms are then only read for those candidates.
+        """
+        phrases = [tokenize(p) for p in _QUOTED.findall(query)]
+        loose = tokenize(_QUOTED.sub(" ", query))
+        if phrase:
+            phrases, loose = [tokenize(query)], []
+        phrases = [p for p in phrases if p]
+        if (not phrases and not loose) or limit < 1:
+            return []
+
+        total_docs = int(self._meta("doc_count", 0)) or 1
+        average_length = int(self._meta("total_length", 0)) / total_docs or 1.0
+        frequency = {term: self._document_frequency(term) for term in {t for p in phrases for t in p} | set(loose)}
+        postings: Dict[str, Dict[int, Tuple[str, int]]] = {}
+
+        # Candidates: documents containing every phrase, else any loose term
+        # (only the selective ones when the query has any)
+        if phrases:
+            candidates = None
+            for terms in phrases:
+                docs = None
+                for term in sorted(set(terms), key=frequency.get):
+                    postings[term] = self._postings(term, fields, None if docs is None else sorted(docs))
+                    docs = set(postings[term]) if docs is None else docs & set(postings[term])
+                entries = [postings[t] for t in terms]
+                docs = {d for d in docs if self._has_phrase(entries, d)}
+                candidates = docs if candidates is None else candidates & docs
+        else:
+            selective = [t for t in loose if frequency[t] <= total_docs * COMMON_TERM_FRACTION] or loose
+            candidates = set()
+            for term in set(selective):
+                postings[term] = self._postings(term, fields)
+                candidates.update(postings[term])
+        if not candidates:
+            return []
+
+        scores = defaultdict(float)
+        for term, df in frequency.items():
+            if not df:
+                continue
+            if term not in postings:
+                postings[term] = self._postings(term, fields, sorted(candidates))
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for doc in candidates.intersection(postings[term]):
+                positions, length = postings[term][doc]
+                count = positions.count(" ") + 1
+                scores[doc] += idf * count * (K1 + 1) / (
+                    count + K1 * (1 - B + B * length / average_length)
+                )
+
+        ranked = sorted(candidates, key=lambda d: (-scores[d], d))[:limit]
+        rows = {
+            row[0]: row[1:] for row in self.db.execute(
+                f"SELECT id, path, field, key, date, answer, text FROM docs WHERE id IN ({', '.join('?' * len(ranked))})",
+                ranked
+            )
+        }
+        results = []
+        for doc in ranked:
+            path, field, key, date, answer, text = rows[doc]
+            results.append({
+                "score": round(scores[doc], 4), "file": path, "field": field, "key": key,
+                "date": date, "answer": answer, "text": text
+            })
+        return results
+
+    def clue_matches(self, clue: str, exclude_files: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Published clues identical to `clue` after normalization."""
+        normalized = normalize_answer(clue)
+        exclude = set(exclude_files or [])
+        return [
+            hit for hit in self.search(clue, fields=["clue"], limit=50, phrase=True)
+            if normalize_answer(hit["text"]) == normalized and hit["file"] not in exclude
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+            "documents": int(self._meta("doc_count", 0)),
+            "terms": self.db.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0],
+            "by_field": dict(self.db.execute("SELECT field, COUNT(*) FROM docs GROUP BY field"))
+        }
+
+
+def open_index(path: str = None) -> SearchIndex:
+    """Open the index and bring it up to date with the published records."""
+    index = SearchIndex(path)
+    index.update()
+    return index
+
+
+def snippet(text: str, query: str, width: int = 80) -> str:
+    """Short excerpt of text around the first query term."""
+    terms = tokenize(query.replace('"', " "))
+    lowered = text.lower()
+    start = 0
+    for term in terms:
+        found = lowered.find(term)
+        if found != -1:
+            start = max(0, found - width // 3)
+            break
+    excerpt = text[start:start + width].replace("\n", " ")
+    return ("…" if start else "") + excerpt + ("…" if start + width < len(text) else "")
+
+
+def main():
+    """Command-line interface for searching published puzzles."""
+    parser = argparse.ArgumentParser(description="Search published clues, explanations, concepts and rationales")
+    parser.add_argument('query', nargs='*', help='Search terms; "quoted parts" must match as phrases')
+    parser.add_argument('--field', action='append', choices=FIELDS, help='Limit to a field (repeatable)')
+    parser.add_argument('--phrase', action='store_true', help='Treat the whole query as one phrase')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum results (default: 10)')
+    parser.add_argument('--rebuild', action='store_true', help='Discard the index and rebuild it')
+    parser.add_argument('--stats', action='store_true', help='Show index statistics')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+    if args.limit < 1:
+        parser.error("--limit must be at least 1")
+
+    if args.rebuild and os.path.exists(config.SEARCH_INDEX_FILE):
+        os.remove(config.SEARCH_INDEX_FILE)
+
+    started = time.perf_counter()
+    index = SearchIndex()
+    counts = index.update()
+    if any(counts.values()) and not args.json:
+        print(f"🔄 Index updated: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed "
+              f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    if args.stats:
+        print(json.dumps(index.stats(), indent=2))
+        return
+    if not args.query:
+        parser.error("a query is required (or use --stats)")
+
+    query = " ".join(args.query)
+    started = time.perf_counter()
+    results = index.search(query, fields=args.field, limit=args.limit, phrase=args.phrase)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"🔍 {len(results)} result(s) for {query!r} in {elapsed:.1f} ms")
+    for hit in results:
+        location = f"{hit['field']} {hit['key']}".strip()
+        print(f"\n  {hit['date']}  {hit['answer']}  [{location}]  score {hit['score']}")
+        print(f"    {snippet(hit['text'], query)}")
+        print(f"    {hit['file']}")
+
+
+if __name__ == "__main__":
+    main()
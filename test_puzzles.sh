@@ -41,8 +41,8 @@ print(f'🧠 Concepts: {len(data.get(\"concepts\", []))}')
     echo "Press Ctrl+C when done testing"
     echo "=============================="
     
-    # Start server
-    python3 -m http.server 8000
+    # Start server (threaded, ETags, compression, live reload on today.json changes)
+    python3 preview_server.py --port 8000
     
 else
     echo "❌ Failed to generate test puzzle"
@@ -0,0 +1,80 @@
+"""Round-trip tests for binary puzzle packs (puzzle_pack.py)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from puzzle_pack import PackError, PuzzlePack, write_pack
+
+
+def make_puzzle(day: str, answer: str, **extra):
+    puzzle = {
+        "date": day,
+        "discipline": "Neurology",
+        "category": "diagnosis",
+        "answer": answer,
+        "acceptable_answers": [answer, answer.upper()],
+        "concepts": [answer, "Neuromyelitis Optica", "Sarcoidosis", "Lyme Disease"],
+        "tiles": [
+            {"clue": "Lhermitte's sign", "difficulty": 1},
+            {"clue": "Oligoclonal bands — CSF", "difficulty": 2, "weight": 0.75},
+        ],
+        "explanations": {"0": "Electric sensation on neck flexion.", "1": "Intrathecal IgG synthesis."},
+        "selection_metadata": {"seed": 2 ** 40, "negative": -3, "nested": [True, False, None, 1.5]},
+    }
+    puzzle.update(extra)
+    return puzzle
+
+
+@pytest.fixture
+def puzzles():
+    # Gaps on purpose: 2025-03-02 and 2025-03-04..06 have no puzzle
+    return {
+        "2025-03-01": make_puzzle("2025-03-01", "Multiple Sclerosis"),
+        "2025-03-03": make_puzzle("2025-03-03", "Sjögren's Syndrome", notes=""),
+        "2025-03-07": make_puzzle("2025-03-07", "Guillain-Barré Syndrome", tiles=[]),
+    }
+
+
+@pytest.fixture
+def pack_path(tmp_path, puzzles):
+    path = str(tmp_path / "fixture.pack")
+    write_pack(puzzles, path)
+    return path
+
+
+def test_every_record_round_trips(pack_path, puzzles):
+    with PuzzlePack(pack_path) as pack:
+        assert len(pack) == len(puzzles)
+        assert pack.dates() == sorted(puzzles)
+        for day, puzzle in puzzles.items():
+            assert day in pack
+            assert pack.get(day) == puzzle
+
+
+def test_absent_dates_inside_range(pack_path):
+    with PuzzlePack(pack_path) as pack:
+        for day in ("2025-03-02", "2025-03-04", "2025-03-06"):
+            assert day not in pack
+            assert pack.get(day) is None
+
+
+def test_dates_outside_range(pack_path):
+    with PuzzlePack(pack_path) as pack:
+        for day in ("2025-02-28", "2025-03-08", "1999-01-01", "2100-12-31"):
+            assert day not in pack
+            assert pack.get(day) is None
+
+
+def test_invalid_date_raises_pack_error(pack_path):
+    with PuzzlePack(pack_path) as pack:
+        with pytest.raises(PackError):
+            pack.get("2025-13-01")
+
+
+def test_empty_pack_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_pack({}, str(tmp_path / "empty.pack"))